@@ -0,0 +1,529 @@
+import copy
+import json
+import os
+import random
+import sys
+import time
+from game import Game
+from perft import REFERENCE_POSITIONS, perft
+from player import HumanPlayer, MinimaxPlayer, ExpectimaxPlayer, MCTSPlayer, MAX_DEPTH
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+# The depth main.py plays at
+DEPTH = 6
+
+OPENINGS = [
+    ((5, 0), (4, 1)),
+    ((5, 2), (4, 3)),
+    ((5, 4), (4, 5)),
+    ((5, 6), (4, 7)),
+]
+
+
+def opening_game(move):
+    """
+    Returns a game where black has played the given first move
+    """
+    game = Game(None, HumanPlayer(BLACK), MinimaxPlayer(RED, DEPTH))
+    game.board.make_move(move)
+    game.player_turn = 2
+    return game
+
+
+def deepcopy_game(game):
+    """
+    Clones the game the way Game.clone did before copy-on-write boards,
+    with a deep copy of the board
+    """
+    new_game = Game(game.win, game.player_1, game.player_2)
+    new_game.black_score = game.black_score
+    new_game.red_score = game.red_score
+    new_game.player_turn = game.player_turn
+    new_game.board = copy.deepcopy(game.board)
+    return new_game
+
+
+def clone_minimax(player, game, depth, alpha, beta, maximizing_player, clone=deepcopy_game):
+    """
+    Minimax that clones the game at every node, the way the players
+    searched before make/unmake
+    """
+    player.nodes += 1
+    if depth == 0:
+        return player.evaluate(game.board), None
+
+    color = player.color if maximizing_player else player.opponent_color()
+    best_eval = -float('inf') if maximizing_player else float('inf')
+    best_move = None
+    for move in game.get_all_valid_moves(color):
+        game_copy = clone(game)
+        game_copy.board.make_move(move)
+        eval, _ = clone_minimax(player, game_copy, depth - 1, alpha, beta, not maximizing_player, clone)
+        if maximizing_player and eval > best_eval or not maximizing_player and eval < best_eval:
+            best_eval = eval
+            best_move = move
+        if maximizing_player:
+            alpha = max(alpha, eval)
+        else:
+            beta = min(beta, eval)
+        if beta <= alpha:
+            break
+    return best_eval, best_move
+
+
+def test_positions(count=12, seed=1):
+    """
+    Returns reproducible positions reached by random play from the start,
+    each with red to move
+    """
+    generator = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = Game(None, HumanPlayer(BLACK), MinimaxPlayer(RED, DEPTH))
+        plies = 2 * generator.randint(1, 15) - 1
+        color = BLACK
+        for _ in range(plies):
+            moves = game.get_all_valid_moves(color)
+            if not moves:
+                break
+            game.board.make_move(generator.choice(moves))
+            color = RED if color == BLACK else BLACK
+        if color == RED and game.get_all_valid_moves(RED):
+            game.player_turn = 2
+            positions.append(game)
+    return positions
+
+
+def run(name, search, tt_size=0):
+    """
+    Runs a search from every opening and prints nodes/sec
+    """
+    nodes = 0
+    elapsed = 0
+    for opening in OPENINGS:
+        player = MinimaxPlayer(RED, DEPTH, tt_size=tt_size, move_ordering=False)
+        game = opening_game(opening)
+        start = time.perf_counter()
+        search(player, game)
+        elapsed += time.perf_counter() - start
+        nodes += player.nodes
+    print(f"{name:<24}{nodes:>10}{elapsed:>10.3f}{nodes / elapsed:>14.0f}")
+    return nodes / elapsed
+
+
+def benchmark_make_move():
+    """
+    Compares cloning the game at every node, with a deep copy as before
+    and with a copy-on-write snapshot as now, with make/unmake search
+    """
+    print(f"Minimax depth {DEPTH} over {len(OPENINGS)} openings")
+    print(f"{'search':<24}{'nodes':>10}{'seconds':>10}{'nodes/sec':>14}")
+    inf = float('inf')
+    before = run("deepcopy per node", lambda player, game: clone_minimax(player, game, DEPTH, -inf, inf, True))
+    run("snapshot clone per node", lambda player, game: clone_minimax(player, game, DEPTH, -inf, inf, True, Game.clone))
+
+    def board_search(player, game):
+        player.backend = 'board'
+        player.minimax(player.search_position(game), DEPTH, -inf, inf, True)
+
+    def bitboard_search(player, game):
+        player.minimax(player.search_position(game), DEPTH, -inf, inf, True)
+
+    after = run("board make/unmake", board_search)
+    bitboard = run("bitboard make/unmake", bitboard_search)
+    print(f"speedup: board {after / before:.1f}x, bitboard {bitboard / before:.1f}x")
+    run("bitboard + table", bitboard_search, tt_size=1 << 16)
+
+
+def benchmark_ordering():
+    """
+    Compares node counts and cutoff rates with and without move ordering
+    """
+    positions = test_positions()
+    print(f"Minimax depth {DEPTH} over {len(positions)} test positions")
+    print(f"{'search':<24}{'nodes':>10}{'cutoffs':>10}{'first move':>12}{'seconds':>10}")
+    for name, options in (
+        ("scan order", {'tt_size': 0, 'move_ordering': False}),
+        ("ordered", {'tt_size': 0, 'move_ordering': True}),
+        ("scan order + table", {'move_ordering': False}),
+        ("ordered + table", {'move_ordering': True}),
+    ):
+        nodes = cutoffs = first_move_cutoffs = 0
+        elapsed = 0
+        for game in positions:
+            player = MinimaxPlayer(RED, DEPTH, **options)
+            start = time.perf_counter()
+            player.search(player.search_position(game))
+            elapsed += time.perf_counter() - start
+            nodes += player.nodes
+            cutoffs += player.cutoffs
+            first_move_cutoffs += player.first_move_cutoffs
+        first_rate = first_move_cutoffs / cutoffs if cutoffs else 0
+        print(f"{name:<24}{nodes:>10}{cutoffs:>10}{first_rate:>12.1%}{elapsed:>10.3f}")
+
+
+def benchmark_parallel(depth=8, worker_counts=(1, 2, 4, 8)):
+    """
+    Reports the speedup of root-parallel search over serial search
+    and whether both choose the same moves
+    """
+    positions = test_positions(4)
+    print(f"Root-parallel minimax depth {depth} over {len(positions)} test positions")
+    print(f"{'workers':<24}{'nodes':>10}{'seconds':>10}{'speedup':>10}{'same move':>12}")
+    serial_moves = []
+    serial_time = None
+    for workers in worker_counts:
+        nodes = 0
+        elapsed = 0
+        moves = []
+        # One player searches every position, so it carries its history
+        # from move to move as it does in a game
+        player = MinimaxPlayer(RED, depth, tt_size=0, workers=workers)
+        for game in positions:
+            start = time.perf_counter()
+            moves.append(player.search(player.search_position(game)))
+            elapsed += time.perf_counter() - start
+            nodes += player.nodes
+        player.close()
+        if serial_time is None:
+            serial_time, serial_moves = elapsed, moves
+        same = sum(1 for move, serial_move in zip(moves, serial_moves) if move == serial_move)
+        print(f"{workers:<24}{nodes:>10}{elapsed:>10.3f}{serial_time / elapsed:>10.2f}{same:>8}/{len(moves)}")
+
+
+def benchmark_evaluation(repeat=20):
+    """
+    Compares scalar and vectorized leaf evaluation on the sibling leaves
+    of the test positions and checks that both give the same scores
+    """
+    from bitboard import BitBoard
+    from vectorized import BatchEvaluator, HEURISTIC_WEIGHTS
+
+    sibling_groups = []
+    for game in test_positions(40):
+        position = BitBoard.from_board(game.board)
+        for color in (RED, BLACK):
+            group = []
+            for move in position.get_all_valid_moves(color):
+                child = position.copy()
+                child.make_move(move)
+                group.append(child)
+            if group:
+                sibling_groups.append(group)
+    leaves = sum(len(group) for group in sibling_groups)
+    print(f"Leaf evaluation over {len(sibling_groups)} sibling groups, {leaves} leaves, x{repeat}")
+    print(f"{'heuristic':<12}{'scalar/sec':>14}{'sibling batch/sec':>20}{'one batch/sec':>16}{'identical':>11}")
+    for heuristic in HEURISTIC_WEIGHTS:
+        player = MinimaxPlayer(RED, DEPTH, heuristic=heuristic)
+        evaluator = BatchEvaluator(RED, HEURISTIC_WEIGHTS[heuristic])
+        everything = [leaf for group in sibling_groups for leaf in group]
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scalar = [player.evaluate(leaf) for leaf in everything]
+        scalar_rate = leaves * repeat / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            batched = [score for group in sibling_groups for score in evaluator.evaluate_many(group)]
+        sibling_rate = leaves * repeat / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            single = evaluator.evaluate_many(everything)
+        single_rate = leaves * repeat / (time.perf_counter() - start)
+
+        identical = scalar == batched == single
+        print(f"{heuristic:<12}{scalar_rate:>14.0f}{sibling_rate:>20.0f}{single_rate:>16.0f}{str(identical):>11}")
+
+
+def benchmark_perft(depth=6):
+    """
+    Reports move generation speed as perft positions/sec from the start
+    position for the board and the bitboard
+    """
+    from board import Board
+    from bitboard import BitBoard
+
+    print("Perft from the start position, black to move")
+    print(f"{'depth':<8}{'positions':>12}{'board/sec':>14}{'bitboard/sec':>14}")
+    for current_depth in range(1, depth + 1):
+        rates = []
+        counts = set()
+        for position in (Board(), BitBoard.from_board(Board())):
+            start = time.perf_counter()
+            counts.add(perft(position, BLACK, current_depth))
+            rates.append(max(counts) / max(time.perf_counter() - start, 1e-9))
+        if len(counts) != 1:
+            raise AssertionError(f"board and bitboard disagree at depth {current_depth}: {sorted(counts)}")
+        print(f"{current_depth:<8}{counts.pop():>12}{rates[0]:>14.0f}{rates[1]:>14.0f}")
+
+
+def benchmark_quiescence(reference_depth=8, depths=(2, 3, 4, 5, 6)):
+    """
+    Compares plain and quiescence search at each depth by cost and by how
+    often the chosen move agrees with a deeper plain search
+    """
+    positions = test_positions()
+    references = []
+    for game in positions:
+        player = MinimaxPlayer(RED, reference_depth)
+        references.append(player.search(player.search_position(game)))
+    print(f"Minimax over {len(positions)} test positions, agreement with plain depth {reference_depth}")
+    print(f"{'search':<24}{'nodes':>10}{'quiescence':>12}{'seconds':>10}{'agree':>8}")
+    for depth in depths:
+        for name, quiescence in (("plain", False), ("quiescence", True)):
+            nodes = quiescence_nodes = agree = 0
+            elapsed = 0
+            for game, reference in zip(positions, references):
+                player = MinimaxPlayer(RED, depth, quiescence=quiescence)
+                start = time.perf_counter()
+                move = player.search(player.search_position(game))
+                elapsed += time.perf_counter() - start
+                nodes += player.nodes
+                quiescence_nodes += player.quiescence_nodes
+                agree += move == reference
+            print(f"{f'depth {depth} {name}':<24}{nodes:>10}{quiescence_nodes:>12}{elapsed:>10.3f}{agree:>5}/{len(positions)}")
+
+
+def benchmark_pvs(depths=(4, 6, 8)):
+    """
+    Compares plain alpha-beta with principal variation search, and plain
+    iterative deepening with aspiration windows, at equal depth. Deepening
+    orders moves differently, so its moves are compared with plain deepening
+    """
+    positions = test_positions()
+    unlimited = 10 ** 9
+    print(f"Minimax over {len(positions)} test positions")
+    print(f"{'search':<38}{'nodes':>10}{'re-searches':>13}{'seconds':>10}{'same move':>11}")
+    for depth in depths:
+        reference_moves = {}
+        for name, options in (
+            ("alpha-beta", {}),
+            ("pvs", {'pvs': True}),
+            ("deepening", {'time_budget_ms': unlimited}),
+            ("deepening + pvs + aspiration", {'time_budget_ms': unlimited, 'pvs': True, 'aspiration_window': 1}),
+        ):
+            nodes = researches = 0
+            elapsed = 0
+            moves = []
+            for game in positions:
+                player = MinimaxPlayer(RED, depth, **options)
+                start = time.perf_counter()
+                moves.append(player.choose_move(player.search_position(game)))
+                elapsed += time.perf_counter() - start
+                nodes += player.nodes
+                researches += player.researches
+            reference = reference_moves.setdefault('time_budget_ms' in options, moves)
+            same = sum(1 for move, reference_move in zip(moves, reference) if move == reference_move)
+            print(f"{f'depth {depth} {name}':<38}{nodes:>10}{researches:>13}{elapsed:>10.3f}{same:>8}/{len(moves)}")
+
+
+def benchmark_expectimax(depths=(4, 6)):
+    """
+    Compares expectimax without pruning, with Star1 and with Star2 for the
+    opponent models, checks that pruning keeps the chosen moves, and reports
+    the depth expectimax reaches in the time minimax needs for depth 6
+    """
+    positions = test_positions()
+    variants = [
+        ("uniform", {}),
+        ("uniform star1", {'pruning': 'star1'}),
+        ("uniform star2", {'pruning': 'star2'}),
+        ("captures", {'opponent_model': 'captures'}),
+        ("captures star1", {'opponent_model': 'captures', 'pruning': 'star1'}),
+        ("softmax", {'opponent_model': 'softmax'}),
+        ("softmax star1", {'opponent_model': 'softmax', 'pruning': 'star1'}),
+        ("softmax top 50%", {'opponent_model': 'softmax', 'probability_mass': 0.5}),
+        ("softmax top 50% star1", {'opponent_model': 'softmax', 'probability_mass': 0.5, 'pruning': 'star1'}),
+    ]
+    print(f"Expectimax over {len(positions)} test positions; pruned moves are compared with the same model unpruned")
+    print(f"{'search':<34}{'nodes':>10}{'seconds':>10}{'same move':>11}")
+    for depth in depths:
+        start = time.perf_counter()
+        for game in positions:
+            player = MinimaxPlayer(RED, depth)
+            player.search(player.search_position(game))
+        print(f"{f'depth {depth} minimax':<34}{'':>10}{time.perf_counter() - start:>10.3f}")
+        reference_moves = {}
+        for name, options in variants:
+            nodes = 0
+            elapsed = 0
+            moves = []
+            for game in positions:
+                player = ExpectimaxPlayer(RED, depth, **options)
+                start = time.perf_counter()
+                moves.append(player.search(player.search_position(game)))
+                elapsed += time.perf_counter() - start
+                nodes += player.nodes
+            model = (options.get('opponent_model'), options.get('probability_mass'))
+            reference = reference_moves.setdefault(model, moves)
+            same = sum(1 for move, reference_move in zip(moves, reference) if move == reference_move)
+            print(f"{f'depth {depth} {name}':<34}{nodes:>10}{elapsed:>10.3f}{same:>8}/{len(moves)}")
+
+    budgets = []
+    for game in positions:
+        player = MinimaxPlayer(RED, DEPTH)
+        start = time.perf_counter()
+        player.search(player.search_position(game))
+        budgets.append(1000 * (time.perf_counter() - start))
+    print(f"Depth reached by expectimax in the time minimax takes for depth {DEPTH}")
+    for name, options in variants:
+        if 'pruning' not in options:
+            continue
+        reached = []
+        for game, budget in zip(positions, budgets):
+            player = ExpectimaxPlayer(RED, MAX_DEPTH, **options)
+            player.search(player.search_position(game), budget)
+            reached.append(player.depth_reached)
+        print(f"{name:<34}{'depths ' + ' '.join(map(str, reached)):>31}")
+
+
+def benchmark_mcts(iterations=400, workers=(1, 2, 4)):
+    """
+    Reports the simulation rate of the Monte Carlo player with root
+    parallelism on more and more worker processes
+    """
+    positions = test_positions()
+    print(f"MCTS over {len(positions)} test positions, {iterations} simulations each")
+    print(f"{'workers':<34}{'simulations':>12}{'seconds':>10}{'sims/sec':>10}")
+    for count in workers:
+        player = MCTSPlayer(RED, iterations, workers=count, reuse_tree=False, seed=0)
+        simulations = 0
+        start = time.perf_counter()
+        for game in positions:
+            player.search(player.search_position(game))
+            simulations += player.nodes
+        elapsed = time.perf_counter() - start
+        player.close()
+        print(f"{count:<34}{simulations:>12}{elapsed:>10.3f}{simulations / elapsed:>10.0f}")
+
+
+def benchmark_render(frames=300, seconds=3, fps=30):
+    """
+    Measures the frame time of the renderer on a still board and with a
+    move every frame, and the CPU the main loop uses at the frame rate cap.
+    Without a display set, pygame renders to a dummy video driver
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from board import Board
+
+    pygame.init()
+    win = pygame.display.set_mode((600, 600))
+    game = Game(win, HumanPlayer(BLACK), MinimaxPlayer(RED, DEPTH))
+    board = game.board
+    game.update()
+    print(f"Rendering with the {pygame.display.get_driver()} video driver")
+    print(f"{'case':<34}{'ms/frame':>10}")
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.update()
+    print(f"{'still board':<34}{1000 * (time.perf_counter() - start) / frames:>10.3f}")
+
+    generator = random.Random(1)
+    color = Board.BLACK
+    start = time.perf_counter()
+    for _ in range(frames):
+        moves = board.get_all_valid_moves(color)
+        if not moves:
+            game.board = board = Board()
+            color = Board.BLACK
+            continue
+        board.make_move(generator.choice(moves))
+        color = Board.RED if color == Board.BLACK else Board.BLACK
+        game.update()
+    print(f"{'a move every frame':<34}{1000 * (time.perf_counter() - start) / frames:>10.3f}")
+
+    clock = pygame.time.Clock()
+    wall, cpu = time.perf_counter(), time.process_time()
+    loops = 0
+    while time.perf_counter() - wall < seconds:
+        pygame.event.get()
+        game.update()
+        clock.tick(fps)
+        loops += 1
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    print(f"{f'main loop at {fps} fps':<34}{1000 * wall / loops:>10.3f}  {100 * cpu / wall:.1f}% CPU")
+    pygame.quit()
+
+
+def search_record(engine, name, fen, depths):
+    """
+    Searches a reference position to every depth in turn and returns the
+    statistics as a JSON-serializable record
+    """
+    from notation import parse_fen
+
+    position, color = parse_fen(fen)
+    results = []
+    previous_nodes = None
+    for depth in depths:
+        player = engine(color, depth)
+        start = time.perf_counter()
+        move = player.search(position.copy())
+        elapsed = time.perf_counter() - start
+        cutoffs = getattr(player, 'cutoffs', None)
+        first_move_cutoffs = getattr(player, 'first_move_cutoffs', None)
+        results.append({
+            'depth': depth,
+            'move': move,
+            'nodes': player.nodes,
+            'seconds': round(elapsed, 6),
+            'nodes_per_sec': round(player.nodes / max(elapsed, 1e-9)),
+            'branching_factor': round(player.nodes / previous_nodes, 3) if previous_nodes else None,
+            'cutoffs': cutoffs,
+            'first_move_cutoff_rate': round(first_move_cutoffs / cutoffs, 4) if cutoffs else None,
+        })
+        previous_nodes = player.nodes
+        if hasattr(player, 'close'):
+            player.close()
+    nodes = sum(result['nodes'] for result in results)
+    seconds = sum(result['seconds'] for result in results)
+    return {
+        'engine': engine.__name__,
+        'position': name,
+        'fen': fen,
+        'nodes': nodes,
+        'seconds': round(seconds, 6),
+        'nodes_per_sec': round(nodes / max(seconds, 1e-9)),
+        'time_to_depth': {result['depth']: result['seconds'] for result in results},
+        'depths': results,
+    }
+
+
+def benchmark_search(minimax_depth=DEPTH, expectimax_depth=4):
+    """
+    Prints search statistics on the reference positions as JSON lines
+    """
+    for engine, max_depth in ((MinimaxPlayer, minimax_depth), (ExpectimaxPlayer, expectimax_depth)):
+        for name, fen, _ in REFERENCE_POSITIONS:
+            print(json.dumps(search_record(engine, name, fen, range(1, max_depth + 1))))
+
+
+BENCHMARKS = {
+    'makemove': benchmark_make_move,
+    'ordering': benchmark_ordering,
+    'parallel': benchmark_parallel,
+    'evaluation': benchmark_evaluation,
+    'perft': benchmark_perft,
+    'search': benchmark_search,
+    'quiescence': benchmark_quiescence,
+    'pvs': benchmark_pvs,
+    'expectimax': benchmark_expectimax,
+    'mcts': benchmark_mcts,
+    'render': benchmark_render,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+from board import Board
+from piece import Piece
+from zobrist import PIECE_KEYS
+
+# The 32 dark squares are numbered row by row, four per row, so square
+# index = row * 4 + col // 2. Bit n of a mask is set when square n is occupied.
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+FULL = 0xFFFFFFFF
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+LEFT_EDGE = 0x10101010
+RIGHT_EDGE = 0x08080808
+CENTER = (1 << 14) | (1 << 17)
+BLACK_KING_ROW = 0x0000000F
+RED_KING_ROW = 0xF0000000
+
+
+def square_coords(square):
+    """
+    Returns the (row, col) coordinates of a dark square index
+    """
+    row = square // 4
+    return row, 2 * (square % 4) + (1 if row % 2 == 0 else 0)
+
+
+def shift_up_left(mask):
+    return ((mask & EVEN_ROWS) >> 4) | ((mask & ODD_ROWS & ~LEFT_EDGE) >> 5)
+
+
+def shift_up_right(mask):
+    return ((mask & EVEN_ROWS & ~RIGHT_EDGE) >> 3) | ((mask & ODD_ROWS) >> 4)
+
+
+def shift_down_left(mask):
+    return (((mask & EVEN_ROWS) << 4) | ((mask & ODD_ROWS & ~LEFT_EDGE) << 3)) & FULL
+
+
+def shift_down_right(mask):
+    return (((mask & EVEN_ROWS & ~RIGHT_EDGE) << 5) | ((mask & ODD_ROWS) << 4)) & FULL
+
+
+# Directions in the same order as Board's MOVE_TABLES: (-1, -1), (-1, 1), (1, -1), (1, 1)
+SHIFTS = (shift_up_left, shift_up_right, shift_down_left, shift_down_right)
+REVERSE_SHIFTS = (shift_down_right, shift_down_left, shift_up_right, shift_up_left)
+BLACK_DIRECTIONS = (0, 1)
+RED_DIRECTIONS = (2, 3)
+KING_DIRECTIONS = (0, 1, 2, 3)
+
+COORDS = [square_coords(square) for square in range(32)]
+SQUARES = {coords: square for square, coords in enumerate(COORDS)}
+
+
+def _neighbour(direction, square):
+    mask = SHIFTS[direction](1 << square)
+    return mask.bit_length() - 1 if mask else -1
+
+
+NEIGHBOURS = [[_neighbour(direction, square) for square in range(32)] for direction in range(4)]
+JUMPS = [[NEIGHBOURS[direction][NEIGHBOURS[direction][square]] if NEIGHBOURS[direction][square] != -1 else -1
+          for square in range(32)] for direction in range(4)]
+
+
+class BitBoard:
+    """
+    Compact checkers position used by the AI search: three 32-bit masks
+    for the black pieces, the red pieces and the kings
+    """
+    __slots__ = ('black', 'red', 'kings', 'zobrist_key')
+
+    def __init__(self, black=0, red=0, kings=0):
+        """
+        Initializes the position from the given masks
+        """
+        self.black = black
+        self.red = red
+        self.kings = kings
+        self.zobrist_key = self.compute_zobrist_key()
+
+    def compute_zobrist_key(self):
+        """
+        Computes the Zobrist key of the position from scratch
+        """
+        key = 0
+        masks = (self.black & ~self.kings, self.black & self.kings, self.red & ~self.kings, self.red & self.kings)
+        for kind, mask in enumerate(masks):
+            while mask:
+                low = mask & -mask
+                key ^= PIECE_KEYS[kind][low.bit_length() - 1]
+                mask ^= low
+        return key
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Builds a bitboard from a Board
+        """
+        black = red = kings = 0
+        for square, (row, col) in enumerate(COORDS):
+            piece = board.board[row][col]
+            if piece != 0:
+                if piece.color == BLACK:
+                    black |= 1 << square
+                else:
+                    red |= 1 << square
+                if piece.king:
+                    kings |= 1 << square
+        return cls(black, red, kings)
+
+    def to_board(self):
+        """
+        Returns a Board with the same pieces, used for drawing
+        """
+        board = Board()
+        for row in range(board.ROWS):
+            for col in range(board.COLS):
+                board.board[row][col] = 0
+        for square, (row, col) in enumerate(COORDS):
+            bit = 1 << square
+            if (self.black | self.red) & bit:
+                color = Board.BLACK if self.black & bit else Board.RED
+                board.board[row][col] = Piece(color, bool(self.kings & bit))
+        board.recompute()
+        return board
+
+    def copy(self):
+        """
+        Returns a copy of the position
+        """
+        position = BitBoard.__new__(BitBoard)
+        position.black, position.red, position.kings = self.black, self.red, self.kings
+        position.zobrist_key = self.zobrist_key
+        return position
+
+    def get_all_valid_moves(self, color):
+        """
+        Returns all the valid moves for a given color in the same order and
+        format as Board.get_all_valid_moves: only the complete capture
+        sequences when any piece can jump, otherwise the steps
+        """
+        if color == BLACK:
+            own, opponent, forward, crown_row = self.black, self.red, BLACK_DIRECTIONS, BLACK_KING_ROW
+        else:
+            own, opponent, forward, crown_row = self.red, self.black, RED_DIRECTIONS, RED_KING_ROW
+        empty = FULL & ~(self.black | self.red)
+        own_kings = own & self.kings
+
+        jumpers = 0
+        for direction in range(4):
+            movers = own if direction in forward else own_kings
+            reverse = REVERSE_SHIFTS[direction]
+            jumpers |= movers & reverse(reverse(empty) & opponent)
+        if jumpers:
+            paths = []
+            while jumpers:
+                low = jumpers & -jumpers
+                square = low.bit_length() - 1
+                jumpers ^= low
+                if self.kings & low:
+                    self.extend_capture([square], opponent, empty | low, KING_DIRECTIONS, 0, 0, paths)
+                else:
+                    self.extend_capture([square], opponent, empty | low, forward, crown_row, 0, paths)
+            return [tuple(COORDS[square] for square in path) for path in paths]
+
+        steps = []
+        for direction in range(4):
+            movers = own if direction in forward else own_kings
+            steps.append(movers & REVERSE_SHIFTS[direction](empty))
+        valid_moves = []
+        sources = steps[0] | steps[1] | steps[2] | steps[3]
+        while sources:
+            low = sources & -sources
+            square = low.bit_length() - 1
+            sources ^= low
+            start = COORDS[square]
+            for direction in range(4):
+                if steps[direction] & low:
+                    valid_moves.append((start, COORDS[NEIGHBOURS[direction][square]]))
+        return valid_moves
+
+    @staticmethod
+    def extend_capture(path, opponent, empty, directions, crown_row, captured, paths):
+        """
+        Adds every complete capture sequence that continues the path of
+        squares to paths, in the same order as Board.extend_capture. The
+        start square counts as empty and captured masks the pieces already
+        jumped. A man that lands on crown_row is crowned and its move ends
+        """
+        square = path[-1]
+        extended = False
+        for direction in directions:
+            landing = JUMPS[direction][square]
+            if landing == -1 or not empty >> landing & 1:
+                continue
+            middle = NEIGHBOURS[direction][square]
+            if opponent >> middle & 1 and not captured >> middle & 1:
+                extended = True
+                path.append(landing)
+                if crown_row >> landing & 1:
+                    paths.append(tuple(path))
+                else:
+                    BitBoard.extend_capture(path, opponent, empty, directions, crown_row, captured | 1 << middle, paths)
+                path.pop()
+        if not extended and len(path) > 1:
+            paths.append(tuple(path))
+
+    def make_move(self, move):
+        """
+        Makes a move along the given path in place, capturing every jumped
+        piece. Returns a record for unmake_move
+        """
+        undo = (self.black, self.red, self.kings, self.zobrist_key)
+        start = SQUARES[move[0]]
+        for coords in move[1:]:
+            end = SQUARES[coords]
+            self.hop(start, end)
+            start = end
+        return undo
+
+    def unmake_move(self, undo):
+        """
+        Takes back a move made with make_move
+        """
+        self.black, self.red, self.kings, self.zobrist_key = undo
+
+    def hop(self, start, end):
+        """
+        Moves a single piece one step or one jump, capturing and promoting
+        as needed. Returns whether a piece was captured
+        """
+        start_bit, end_bit = 1 << start, 1 << end
+        if self.black & start_bit:
+            self.black ^= start_bit | end_bit
+            promote = end_bit & BLACK_KING_ROW
+            kind = 0
+        else:
+            self.red ^= start_bit | end_bit
+            promote = end_bit & RED_KING_ROW
+            kind = 2
+        if self.kings & start_bit:
+            self.kings ^= start_bit | end_bit
+            self.zobrist_key ^= PIECE_KEYS[kind + 1][start] ^ PIECE_KEYS[kind + 1][end]
+        elif promote:
+            self.kings |= end_bit
+            self.zobrist_key ^= PIECE_KEYS[kind][start] ^ PIECE_KEYS[kind + 1][end]
+        else:
+            self.zobrist_key ^= PIECE_KEYS[kind][start] ^ PIECE_KEYS[kind][end]
+
+        start_row, end_row = start // 4, end // 4
+        if abs(start_row - end_row) != 2:
+            return False
+        middle = SQUARES[((start_row + end_row) // 2, (COORDS[start][1] + COORDS[end][1]) // 2)]
+        middle_bit = 1 << middle
+        self.zobrist_key ^= PIECE_KEYS[(2 if self.red & middle_bit else 0) + (1 if self.kings & middle_bit else 0)][middle]
+        self.black &= ~middle_bit
+        self.red &= ~middle_bit
+        self.kings &= ~middle_bit
+        return True
+
+    def capture_count(self, move):
+        """
+        Returns the number of pieces the move takes
+        """
+        return len(move) - 1 if abs(move[0][0] - move[1][0]) == 2 else 0
+
+    def piece_count(self, color):
+        """
+        Returns the number of pieces of the given color
+        """
+        return (self.black if color == BLACK else self.red).bit_count()
+
+    def king_count(self, color):
+        """
+        Returns the number of kings of the given color
+        """
+        return ((self.black if color == BLACK else self.red) & self.kings).bit_count()
+
+    def center_count(self, color):
+        """
+        Returns the number of pieces of the given color in the center of the board
+        """
+        return ((self.black if color == BLACK else self.red) & CENTER).bit_count()
@@ -1,29 +1,61 @@
-import pygame
+import os
 from piece import Piece
+from zobrist import piece_key
+
+# Indexes of the running totals the board keeps for each side
+PIECES, KINGS, CENTER, ADVANCEMENT = range(4)
+CENTER_SQUARES = frozenset([(3, 3), (3, 4), (4, 3), (4, 4)])
+
+
+class MoveUndo:
+    """
+    Record of a move made with Board.make_move, used to take the move back
+    """
+
+    def __init__(self, piece, row, col, jumped_square, valid_moves):
+        """
+        Initializes the record for the given moving piece and its square
+        """
+        self.piece = piece
+        self.path = [(row, col)]
+        self.captured = []
+        self.jumped_square = jumped_square
+        self.valid_moves = valid_moves
 
 
 class Board:
     """
-    Class consisting of all elements required for a board in the game Checkers
+    Class consisting of all elements required for a board in the game Checkers.
+    Snapshots made with clone share their rows with the original board, and
+    a row is only copied when one of the boards changes it
     """
 
     ROWS, COLS = 8, 8
-    SQUARE_SIZE = 600 // 8
-    DARK = (150, 90, 20)
-    LIGHT = (220, 160, 90)
     BLACK = (0, 0, 0)
     RED = (255, 0, 0)
-    WHITE = (255, 255, 255)
-    GREEN = (0, 255, 0)
+
+    # When set, every move asserts that the incrementally kept Zobrist key
+    # and totals match a recomputation from scratch
+    CHECK_INCREMENTAL = os.environ.get('CHECKERS_CHECK_INCREMENTAL') == '1'
 
     def __init__(self):
         """
         Initializes the board with the game settings
         """
         self.board = []
-        self.selected_piece = None
-        self.jumped_piece = None
+        # Rows this board may change in place; the others are shared with a snapshot
+        self.owned_rows = [True] * self.ROWS
+        self.shared = False
+        self.selected_square = None
+        self.jumped_square = None
+        # Square where a jump just crowned a man, which ends the move
+        self.crowned_square = None
         self.valid_moves = []
+        self.zobrist_key = 0
+        self.totals = {self.BLACK: [0, 0, 0, 0], self.RED: [0, 0, 0, 0]}
+        # Legal moves of each color in the current position, filled in by
+        # legal_moves and cleared whenever a piece moves or is removed
+        self.move_cache = {}
         self.create_board()
         self.board_size = 8
 
@@ -36,37 +68,98 @@ class Board:
             for col in range(self.COLS):
                 if row % 2 != col % 2:
                     if row < 3:
-                        self.board[row].append(Piece(row, col, self.RED))
+                        self.board[row].append(Piece(self.RED))
                     elif row > 4:
-                        self.board[row].append(Piece(row, col, self.BLACK))
+                        self.board[row].append(Piece(self.BLACK))
                     else:
                         self.board[row].append(0)
                 else:
                     self.board[row].append(0)
+        self.recompute()
 
-    def draw_squares(self, win):
+    def compute_zobrist_key(self):
         """
-        Draws all the squares in the board
+        Computes the Zobrist key of the pieces on the board from scratch
         """
-        win.fill(self.DARK)
+        key = 0
         for row in range(self.ROWS):
-            for col in range(row % 2, self.COLS, 2):
-                pygame.draw.rect(win, self.LIGHT, (col*self.SQUARE_SIZE, row*self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE))
+            for col in range(self.COLS):
+                piece = self.board[row][col]
+                if piece != 0:
+                    key ^= piece_key(piece.color, piece.king, row, col)
+        return key
 
-    def draw(self, win):
+    def compute_totals(self):
         """
-        Draws all the pieces in the board
+        Computes the running totals of both sides from scratch
         """
-        self.draw_squares(win)
+        totals = {self.BLACK: [0, 0, 0, 0], self.RED: [0, 0, 0, 0]}
         for row in range(self.ROWS):
             for col in range(self.COLS):
                 piece = self.board[row][col]
                 if piece != 0:
-                    piece.draw(win)
-        if self.selected_piece:
-            pygame.draw.circle(win, self.WHITE, (self.selected_piece.x, self.selected_piece.y), self.SQUARE_SIZE // 2, 4)
-            for move in self.valid_moves:
-                pygame.draw.circle(win, self.GREEN, (move[1] * self.SQUARE_SIZE + self.SQUARE_SIZE // 2, move[0] * self.SQUARE_SIZE + self.SQUARE_SIZE // 2), self.SQUARE_SIZE // 4)
+                    self.add_to_totals(totals[piece.color], piece, row, col, 1)
+        return totals
+
+    def recompute(self):
+        """
+        Recomputes the Zobrist key and the totals after the squares were
+        filled in directly
+        """
+        self.zobrist_key = self.compute_zobrist_key()
+        self.totals = self.compute_totals()
+        self.move_cache.clear()
+
+    def check_incremental(self):
+        """
+        Asserts that the incrementally kept Zobrist key and totals match
+        the ones recomputed from scratch
+        """
+        assert self.zobrist_key == self.compute_zobrist_key(), "incremental Zobrist key is out of date"
+        assert self.totals == self.compute_totals(), "incremental totals are out of date"
+
+    @staticmethod
+    def add_to_totals(totals, piece, row, col, sign):
+        """
+        Adds (sign 1) or removes (sign -1) a piece on the given square
+        to the totals of its side
+        """
+        totals[PIECES] += sign
+        if piece.king:
+            totals[KINGS] += sign
+        elif piece.color == Board.BLACK:
+            totals[ADVANCEMENT] += sign * (7 - row)
+        else:
+            totals[ADVANCEMENT] += sign * row
+        if (row, col) in CENTER_SQUARES:
+            totals[CENTER] += sign
+
+    def account(self, piece, row, col, sign):
+        """
+        Adds (sign 1) or removes (sign -1) a piece on the given square
+        to the Zobrist key and the running totals
+        """
+        self.zobrist_key ^= piece_key(piece.color, piece.king, row, col)
+        self.add_to_totals(self.totals[piece.color], piece, row, col, sign)
+
+    def own_rows(self, *rows):
+        """
+        Copies the given rows if they are shared with a snapshot, so that
+        this board can change them in place
+        """
+        for row in rows:
+            if not self.owned_rows[row]:
+                self.board[row] = self.board[row][:]
+                self.owned_rows[row] = True
+        self.shared = not all(self.owned_rows)
+
+    def set_square(self, row, col, piece):
+        """
+        Puts a piece, or 0 for none, on a square
+        """
+        if self.shared:
+            self.own_rows(row)
+        self.board[row][col] = piece
 
     def select(self, row, col, color):
         """
@@ -75,9 +168,9 @@ class Board:
         """
         piece = self.board[row][col]
         if piece != 0 and piece.color == color:
-            self.selected_piece = piece
-            if self.jumped_piece is None:
-                self.valid_moves = self.get_valid_moves(row, col)
+            self.selected_square = (row, col)
+            if self.jumped_square is None:
+                self.valid_moves = self.first_hops(row, col, color)
             else:
                 self.valid_moves = self.get_valid_moves_after_jump(row, col)
 
@@ -86,87 +179,122 @@ class Board:
         Checks whether a selected piece is valid
         and clears the selected piece if not valid
         """
-        if self.selected_piece:
-            result = self.move(self.selected_piece, row, col)
-            if result and self.jumped_piece is None:
-                self.selected_piece = None
+        if self.selected_square:
+            result = self.move(*self.selected_square, row, col)
+            if result and self.jumped_square is None:
+                self.selected_square = None
                 self.valid_moves = []
+            elif result:
+                self.selected_square = (row, col)
 
-    def move(self, piece, row, col):
+    def move(self, piece_row, piece_col, row, col):
         """
-        Moves the selected piece to the given coordinates
+        Moves the piece on the given square to the given coordinates
         """
         if (row, col) in self.valid_moves:
-            if abs(piece.row - row) == 2 and abs(piece.col - col) == 2:
-                mid_row = (piece.row + row) // 2
-                mid_col = (piece.col + col) // 2
-                self.jumped_piece = self.board[mid_row][mid_col]
-            self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
-            piece.move(row, col)
+            piece = self.board[piece_row][piece_col]
+            jump = abs(piece_row - row) == 2 and abs(piece_col - col) == 2
+            if jump:
+                self.jumped_square = ((piece_row + row) // 2, (piece_col + col) // 2)
+            self.account(piece, piece_row, piece_col, -1)
+            self.set_square(piece_row, piece_col, 0)
+            moved = piece.moved_to(row)
+            self.crowned_square = (row, col) if jump and moved is not piece else None
+            self.set_square(row, col, moved)
+            self.account(moved, row, col, 1)
             self.valid_moves = []
+            self.move_cache.clear()
+            if self.CHECK_INCREMENTAL:
+                self.check_incremental()
             return True
         return False
 
-    def get_valid_moves(self, row, col):
+    def get_valid_moves_after_jump(self, row, col):
         """
-        Returns a list of valid moves for the given coordinates
+        Returns all valid moves after a jump for given coordinates. A man
+        crowned by the jump cannot jump on
         """
+        if (row, col) == self.crowned_square:
+            return []
+        board = self.board
+        piece = board[row][col]
         moves = []
-        if self.board[row][col].color is self.BLACK and self.board[row][col].king is False:
-            directions = [(-1, -1), (-1, 1)]
-        elif self.board[row][col].color is self.RED and self.board[row][col].king is False:
-            directions = [(1, -1), (1, 1)]
-        else:
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-        for drow, dcol in directions:
-            new_row, new_col = row + drow, col + dcol
-            if 0 <= new_row < self.ROWS and 0 <= new_col < self.COLS and self.board[new_row][new_col] == 0:
-                moves.append((new_row, new_col))
-
-        for drow, dcol in directions:
-            jump_row, jump_col = row + 2 * drow, col + 2 * dcol
-            mid_row, mid_col = row + drow, col + dcol
-            piece = self.board[row][col]
-
-            if self.is_valid_jump(piece, mid_row, mid_col, jump_row, jump_col):
-                moves.append((jump_row, jump_col))
+        for (step_row, step_col), jump in MOVE_TABLES[piece.color, piece.king][row][col]:
+            if jump is not None:
+                target = board[step_row][step_col]
+                if target != 0 and target.color != piece.color and board[jump[0]][jump[1]] == 0:
+                    moves.append(jump)
         return moves
 
-    def is_valid_jump(self, piece, mid_row, mid_col, jump_row, jump_col):
+    def get_all_valid_moves(self, color):
         """
-        Checks whether a jump is valid
+        Returns all the valid moves for a given color (player). A move is
+        the path of squares the piece visits. Capturing is mandatory, so
+        when any piece can jump only the complete capture sequences are
+        valid, one move for every branch
         """
-        if 0 <= jump_row < self.board_size and 0 <= jump_col < self.board_size:
-            mid_piece = self.get_piece(mid_row, mid_col)
-            landing_piece = self.get_piece(jump_row, jump_col)
-
-            if mid_piece != 0 and mid_piece.color != piece.color and landing_piece == 0:
-                return True
-        return False
+        board = self.board
+        steps = []
+        jumps = []
+        for row, col in DARK_SQUARES:
+            piece = board[row][col]
+            if piece != 0 and piece.color == color:
+                for (step_row, step_col), jump in MOVE_TABLES[piece.color, piece.king][row][col]:
+                    target = board[step_row][step_col]
+                    if target == 0:
+                        if not jumps:
+                            steps.append(((row, col), (step_row, step_col)))
+                    elif jump is not None and target.color != color and board[jump[0]][jump[1]] == 0:
+                        self.extend_capture(piece, [(row, col)], [], jumps)
+                        break
+        return jumps or steps
 
-    def get_valid_moves_after_jump(self, row, col):
+    def extend_capture(self, piece, path, captured, paths):
         """
-        Returns all valid moves after a jump for given coordinates
+        Adds every complete capture sequence that continues the path to
+        paths. Jumped pieces stay on the board until the move is made, so
+        captured lists their squares, which cannot be jumped again. A man
+        that reaches the far row is crowned and its move ends
         """
-        moves = []
-
-        if self.board[row][col].color is self.BLACK and self.board[row][col].king is False:
-            directions = [(-1, -1), (-1, 1)]
-        elif self.board[row][col].color is self.RED and self.board[row][col].king is False:
-            directions = [(1, -1), (1, 1)]
-        else:
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-        for drow, dcol in directions:
-            new_row, new_col = row + 2 * drow, col + 2 * dcol
-            if 0 > new_row or new_row >= self.ROWS or 0 > new_col or new_col >= self.COLS:
+        board = self.board
+        row, col = path[-1]
+        extended = False
+        for step, jump in MOVE_TABLES[piece.color, piece.king][row][col]:
+            if jump is None or step in captured:
                 continue
-            mid_row, mid_col = row + drow, col + dcol
-            piece = self.board[row][col]
+            target = board[step[0]][step[1]]
+            if target != 0 and target.color != piece.color and (board[jump[0]][jump[1]] == 0 or jump == path[0]):
+                extended = True
+                path.append(jump)
+                if piece.moved_to(jump[0]) is piece:
+                    captured.append(step)
+                    self.extend_capture(piece, path, captured, paths)
+                    captured.pop()
+                else:
+                    paths.append(tuple(path))
+                path.pop()
+        if not extended and len(path) > 1:
+            paths.append(tuple(path))
+
+    def first_hops(self, row, col, color):
+        """
+        Returns the squares the piece on the given square can move or make
+        its first jump to, following the capture rule
+        """
+        hops = []
+        for move in self.legal_moves(color):
+            if move[0] == (row, col) and move[1] not in hops:
+                hops.append(move[1])
+        return hops
 
-            if self.is_valid_jump(piece, mid_row, mid_col, new_row, new_col):
-                moves.append((new_row, new_col))
+    def legal_moves(self, color):
+        """
+        Returns all the valid moves for a given color, generated once per
+        position. The list is shared between callers and must not be modified
+        """
+        moves = self.move_cache.get(color)
+        if moves is None:
+            moves = self.move_cache[color] = self.get_all_valid_moves(color)
         return moves
 
     def get_piece(self, row, col):
@@ -177,50 +305,173 @@ class Board:
 
     def make_move(self, move):
         """
-        Makes a move
+        Makes a move along the given path, capturing every jumped piece.
+        Returns a record for unmake_move
         """
-        piece_row, piece_col = move[0][0], move[0][1]
-        piece = self.board[piece_row][piece_col]
-        new_pos_row, new_pos_col = move[1]
+        row, col = move[0]
+        undo = MoveUndo(self.board[row][col], row, col, self.jumped_square, self.valid_moves)
 
+        for new_pos_row, new_pos_col in move[1:]:
+            self.hop(row, col, new_pos_row, new_pos_col, undo)
+            row, col = new_pos_row, new_pos_col
+
+        self.valid_moves = []
+        self.move_cache.clear()
+        if self.CHECK_INCREMENTAL:
+            self.check_incremental()
+        return undo
+
+    def hop(self, piece_row, piece_col, new_pos_row, new_pos_col, undo):
+        """
+        Moves a piece one step or one jump and records it in the undo record
+        """
+        if self.shared:
+            self.own_rows(piece_row, (piece_row + new_pos_row) // 2, new_pos_row)
+        board = self.board
+        piece = board[piece_row][piece_col]
         if abs(piece_row - new_pos_row) == 2 and abs(piece_col - new_pos_col) == 2:
             mid_row = (piece_row + new_pos_row) // 2
             mid_col = (piece_col + new_pos_col) // 2
-            self.jumped_piece = self.board[mid_row][mid_col]
+            jumped_piece = board[mid_row][mid_col]
+            self.jumped_square = (mid_row, mid_col)
+            undo.captured.append((mid_row, mid_col, jumped_piece))
+            board[mid_row][mid_col] = 0
+            self.account(jumped_piece, mid_row, mid_col, -1)
 
-        moved_piece = self.board[piece_row][piece_col]
-        self.board[new_pos_row][new_pos_col] = moved_piece
-        self.board[piece_row][piece_col] = 0
-        piece.move(new_pos_row, new_pos_col)
+        self.account(piece, piece_row, piece_col, -1)
+        board[piece_row][piece_col] = 0
+        piece = piece.moved_to(new_pos_row)
+        board[new_pos_row][new_pos_col] = piece
+        self.account(piece, new_pos_row, new_pos_col, 1)
+        undo.path.append((new_pos_row, new_pos_col))
 
-        self.valid_moves = []
+    def unmake_move(self, undo):
+        """
+        Takes back a move made with make_move
+        """
+        end_row, end_col = undo.path[-1]
+        start_row, start_col = undo.path[0]
+        if self.shared:
+            self.own_rows(end_row, start_row, *(row for row, _, _ in undo.captured))
+        board = self.board
+        self.account(board[end_row][end_col], end_row, end_col, -1)
+        board[end_row][end_col] = 0
+        board[start_row][start_col] = undo.piece
+        self.account(undo.piece, start_row, start_col, 1)
+        for row, col, captured in undo.captured:
+            board[row][col] = captured
+            self.account(captured, row, col, 1)
+        self.jumped_square = undo.jumped_square
+        self.valid_moves = undo.valid_moves
+        self.move_cache.clear()
+        if self.CHECK_INCREMENTAL:
+            self.check_incremental()
+
+    def capture_count(self, move):
+        """
+        Returns the number of pieces the move takes
+        """
+        return len(move) - 1 if abs(move[0][0] - move[1][0]) == 2 else 0
 
     def place_piece(self, piece, row, col):
         """
         Places a piece in a new position
         """
-        self.board[row][col] = piece
-        piece.move(row, col)
+        occupant = self.board[row][col]
+        if occupant != 0:
+            self.account(occupant, row, col, -1)
+        self.set_square(row, col, piece)
+        self.account(piece, row, col, 1)
+        self.move_cache.clear()
+        if self.CHECK_INCREMENTAL:
+            self.check_incremental()
 
     def clone(self):
         """
-        Clones the board
+        Returns a snapshot of the board. The rows are shared until either
+        board changes one of them, so a snapshot only copies references
         """
-        new_board = Board()
-        new_board.jumped_piece = self.jumped_piece
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                new_board.board[row][col] = 0
-
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                if self.board[row][col] != 0:
-                    new_board.board[row][col] = self.get_piece(row, col).clone()
-
+        new_board = object.__new__(Board)
+        new_board.board = self.board[:]
+        self.owned_rows = [False] * self.ROWS
+        self.shared = True
+        new_board.owned_rows = [False] * self.ROWS
+        new_board.shared = True
+        new_board.selected_square = self.selected_square
+        new_board.jumped_square = self.jumped_square
+        new_board.crowned_square = self.crowned_square
+        new_board.valid_moves = self.valid_moves[:]
+        new_board.zobrist_key = self.zobrist_key
+        new_board.totals = {color: totals[:] for color, totals in self.totals.items()}
+        new_board.move_cache = self.move_cache.copy()
+        new_board.board_size = self.board_size
         return new_board
 
     def delete_piece(self, row, col):
         """
         Deletes a piece at a given position
         """
-        self.board[row][col] = 0
+        piece = self.board[row][col]
+        if piece != 0:
+            self.account(piece, row, col, -1)
+        self.set_square(row, col, 0)
+        self.move_cache.clear()
+        if self.CHECK_INCREMENTAL:
+            self.check_incremental()
+
+    def piece_count(self, color):
+        """
+        Returns the number of pieces of the given color
+        """
+        return self.totals[color][PIECES]
+
+    def king_count(self, color):
+        """
+        Returns the number of kings of the given color
+        """
+        return self.totals[color][KINGS]
+
+    def center_count(self, color):
+        """
+        Returns the number of pieces of the given color in the center of the board
+        """
+        return self.totals[color][CENTER]
+
+    def advancement(self, color):
+        """
+        Returns the number of rows the men of the given color have advanced in total
+        """
+        return self.totals[color][ADVANCEMENT]
+
+
+# The squares pieces can stand on, in the row-major order moves are listed in
+DARK_SQUARES = [(row, col) for row in range(Board.ROWS) for col in range(Board.COLS) if row % 2 != col % 2]
+
+
+def move_table(directions):
+    """
+    Returns, for every dark square, the (step, jump) target pairs in the
+    given directions. Steps off the board are left out and the jump is
+    None when only the step fits on the board
+    """
+    table = [[() for _ in range(Board.COLS)] for _ in range(Board.ROWS)]
+    for row, col in DARK_SQUARES:
+        entries = []
+        for drow, dcol in directions:
+            step_row, step_col = row + drow, col + dcol
+            if not (0 <= step_row < Board.ROWS and 0 <= step_col < Board.COLS):
+                continue
+            jump_row, jump_col = row + 2 * drow, col + 2 * dcol
+            jump = (jump_row, jump_col) if 0 <= jump_row < Board.ROWS and 0 <= jump_col < Board.COLS else None
+            entries.append(((step_row, step_col), jump))
+        table[row][col] = tuple(entries)
+    return table
+
+
+# Move tables by (color, king), in the direction order the rules always used
+MOVE_TABLES = {
+    (Board.BLACK, False): move_table([(-1, -1), (-1, 1)]),
+    (Board.RED, False): move_table([(1, -1), (1, 1)]),
+    (Board.BLACK, True): move_table([(-1, -1), (-1, 1), (1, -1), (1, 1)]),
+    (Board.RED, True): move_table([(-1, -1), (-1, 1), (1, -1), (1, 1)]),
+}
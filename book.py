@@ -0,0 +1,223 @@
+import argparse
+import concurrent.futures
+import mmap
+import random
+import struct
+import sys
+import time
+from bitboard import BitBoard, COORDS, SQUARES
+from board import Board
+from player import MinimaxPlayer
+from zobrist import side_key
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+MAGIC = b'CKBOOK01'
+HEADER = struct.Struct('<8sI')
+# Position key, move start and end squares, weight
+RECORD = struct.Struct('<QBBH')
+# Weight of a move as good as the best one; every point of evaluation
+# below the best move costs BOOK_PENALTY
+BOOK_WEIGHT = 100
+BOOK_PENALTY = 40
+
+
+def position_key(position, color):
+    """
+    Returns the book key of a Board or BitBoard position with the color to move
+    """
+    return position.zobrist_key ^ side_key(color)
+
+
+def encode_move(move):
+    """
+    Returns the start and end squares of a move as dark square indexes.
+    A capture sequence is stored by where it starts and ends
+    """
+    return SQUARES[move[0]], SQUARES[move[-1]]
+
+
+def decode_move(start, end):
+    """
+    Returns the move between two dark square indexes
+    """
+    return COORDS[start], COORDS[end]
+
+
+class OpeningBook:
+    """
+    Read-only opening book file. The records are sorted by position key and
+    looked up with a binary search over a memory map, so the book is never
+    loaded into the Python heap
+    """
+
+    def __init__(self, path):
+        """
+        Opens and memory maps the book file
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be memory mapped
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.count = HEADER.unpack_from(self.data, 0) if len(self.data) >= HEADER.size else (None, 0)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    def __len__(self):
+        return self.count
+
+    def key_at(self, index):
+        """
+        Returns the position key of the record at the given index
+        """
+        return struct.unpack_from('<Q', self.data, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key):
+        """
+        Returns the (move, weight) pairs stored for a position key
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.count:
+            record_key, start, end, weight = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+            if record_key != key:
+                break
+            entries.append((decode_move(start, end), weight))
+            low += 1
+        return entries
+
+    def probe(self, position, color):
+        """
+        Returns the book moves that are legal in the position, with their weights
+        """
+        entries = self.lookup(position_key(position, color))
+        if not entries:
+            return []
+        legal = {(move[0], move[-1]): move for move in position.get_all_valid_moves(color)}
+        return [(legal[move], weight) for move, weight in entries if move in legal]
+
+    def choose(self, position, color, generator=random):
+        """
+        Returns a book move picked at random by weight, or None when the
+        position is not in the book
+        """
+        entries = self.probe(position, color)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return generator.choices(moves, weights)[0]
+
+    def close(self):
+        """
+        Unmaps and closes the book file
+        """
+        self.data.close()
+        self.file.close()
+
+
+def write_book(path, entries):
+    """
+    Writes (key, move, weight) entries as a sorted book file
+    """
+    records = sorted(entries, key=lambda entry: (entry[0], -entry[2]))
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(records)))
+        for key, move, weight in records:
+            file.write(RECORD.pack(key, *encode_move(move), weight))
+
+
+def book_moves(task):
+    """
+    Searches every move of a book position and returns the key with the
+    moves that are within the margin of the best one and their weights
+    """
+    black, red, kings, color, depth, margin = task
+    position = BitBoard(black, red, kings)
+    player = MinimaxPlayer(color, depth)
+    values = []
+    best = -float('inf')
+    for move in position.get_all_valid_moves(color):
+        undo = position.make_move(move)
+        # Moves that fail low against this window are outside the margin anyway
+        value, _ = player.minimax(position, depth - 1, best - margin - 1, float('inf'), False, ply=1)
+        position.unmake_move(undo)
+        values.append((value, move))
+        best = max(best, value)
+    if not values:
+        return position_key(position, color), []
+    moves = [(move, max(1, round(BOOK_WEIGHT - BOOK_PENALTY * (best - value))))
+             for value, move in values if value >= best - margin]
+    return position_key(position, color), moves
+
+
+def book_positions(plies):
+    """
+    Returns every position reachable from the start in at most the given
+    number of plies, without repeats, as (black, red, kings, color) tuples
+    """
+    start = BitBoard.from_board(Board())
+    frontier = [(start, BLACK)]
+    seen = {position_key(start, BLACK)}
+    positions = [(start.black, start.red, start.kings, BLACK)]
+    for _ in range(plies):
+        next_frontier = []
+        for position, color in frontier:
+            opponent = RED if color == BLACK else BLACK
+            for move in position.get_all_valid_moves(color):
+                child = position.copy()
+                child.make_move(move)
+                key = position_key(child, opponent)
+                if key not in seen:
+                    seen.add(key)
+                    next_frontier.append((child, opponent))
+                    positions.append((child.black, child.red, child.kings, opponent))
+        frontier = next_frontier
+    return positions
+
+
+def build_book(path, plies=4, depth=8, margin=0, workers=None):
+    """
+    Searches every position up to the given number of plies from the start
+    and writes the best moves to a book file. Both sides are covered, so
+    the book answers whichever first moves the opponent plays
+    """
+    positions = book_positions(plies)
+    entries = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = [position + (depth, margin) for position in positions]
+        for key, moves in executor.map(book_moves, tasks, chunksize=8):
+            for move, weight in moves:
+                entries.append((key, move, weight))
+    write_book(path, entries)
+    return len(positions), len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book by searching the first plies deeply")
+    parser.add_argument('output', help='book file to write')
+    parser.add_argument('--plies', type=int, default=4, help='plies from the start position the book covers')
+    parser.add_argument('--depth', type=int, default=8, help='search depth for every book position')
+    parser.add_argument('--margin', type=int, default=0, help='keep moves scoring at most this much below the best')
+    parser.add_argument('--workers', type=int, default=None, help='processes to search on (default: all cores)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    positions, records = build_book(args.output, args.plies, args.depth, args.margin, args.workers)
+    print(f"{positions} positions, {records} moves written to {args.output} in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
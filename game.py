@@ -1,26 +1,7 @@
+import asyncio
 import copy
 from board import *
-import time
-
-
-pygame.font.init()
-FONT = pygame.font.SysFont('Arial', 30)
-start_time = time.time()
-
-
-def draw_timer_and_score(win, black_score, red_score):
-    """
-    Shows text for the result and time
-    """
-    current_time = int(time.time() - start_time)
-    minutes = current_time // 60
-    seconds = current_time % 60
-
-    timer_text = FONT.render(f"Time: {minutes}:{seconds:02}", True, (255, 255, 255))
-    win.blit(timer_text, (10, 10))
-
-    score_text = FONT.render(f"Black: {black_score}  Red: {red_score}", True, (255, 255, 255))
-    win.blit(score_text, (10, 50))
+from worker import SearchWorker
 
 
 class Game:
@@ -29,12 +10,18 @@ class Game:
     """
 
     SQUARE_SIZE = 600 // 8
+    AI_DELAY = 0.5
 
-    def __init__(self, win, player_1, player_2):
+    def __init__(self, win, player_1, player_2, show_stats=False):
         """
-        Initialize necessary objects for a checkers game
+        Initialize necessary objects for a checkers game. With show_stats
+        the window also shows how fast and how deep the AI searches
         """
         self.win = win
+        self.renderer = None
+        if win is not None:
+            from render import Renderer
+            self.renderer = Renderer(win)
         self.player_1 = player_1
         self.player_2 = player_2
         self.board = Board()
@@ -43,20 +30,72 @@ class Game:
         self.player_turn = 1
         self.board_size = 8
         self.game_won = False
+        self.ai_search = None
+        self.ai_move_task = None
+        self.show_stats = show_stats
 
     def update(self):
         """
-        Updates the game state and time elapsed since the start of the game
+        Updates the game state and time elapsed since the start of the game,
+        and the AI's search statistics when they are shown
+        """
+        if self.renderer is not None:
+            self.renderer.update(self)
+
+    def search_stats_text(self):
+        """
+        Returns the AI's nodes per second and depth reached, counted live
+        while it is thinking and otherwise taken from its last search
+        """
+        player = self.player_2
+        if self.ai_search is not None and not self.ai_search.done():
+            nodes_per_second = player.nodes / max(self.ai_search.elapsed(), 1e-9)
+            return f"AI: {nodes_per_second:,.0f} nodes/s  depth {player.depth_reached}"
+        stats = getattr(player, 'last_stats', None)
+        if stats is None:
+            return "AI: waiting"
+        return f"AI: {stats.nodes_per_second():,.0f} nodes/s  depth {stats.depth}/{stats.selective_depth()}"
+
+    def poll_ai_turn(self):
+        """
+        Called by the main loop on every frame: starts the AI search in a
+        worker when it is the AI's turn and, once the worker has a move,
+        schedules playing it
         """
-        self.board.draw(self.win)
-        draw_timer_and_score(self.win, self.black_score, self.red_score)
-        pygame.display.update()
+        if self.player_turn != 2 or self.ai_move_task is not None:
+            return
+        if self.ai_search is None:
+            if not self.is_over():
+                self.ai_search = SearchWorker(self.player_2, self, self.get_all_valid_moves(self.board.RED))
+            return
+        if self.ai_search.done() and self.ai_search.elapsed() >= self.AI_DELAY:
+            move = self.ai_search.result()
+            self.ai_search = None
+            self.ai_move_task = asyncio.ensure_future(self.handle_ai_turn(move))
 
-    async def handle_ai_turn(self):
+    async def handle_ai_turn(self, move):
         """
-        Handle AI's turn to make a move on the board
+        Plays the AI's move, animating multiple jumps without blocking the event loop
         """
-        self.player_2.get_move(self)
+        try:
+            if move is not None:
+                await self.player_2.execute_multijump_async(self, move)
+            self.player_turn = 1
+            self.board.jumped_square = None
+            self.board.selected_square = None
+        finally:
+            self.ai_move_task = None
+
+    def cancel_ai_turn(self):
+        """
+        Stops a running AI search and move animation, e.g. when the window closes
+        """
+        if self.ai_search is not None:
+            self.ai_search.cancel()
+            self.ai_search = None
+        if self.ai_move_task is not None:
+            self.ai_move_task.cancel()
+            self.ai_move_task = None
 
     def get_mouse_position(self, pos):
         """
@@ -75,19 +114,11 @@ class Game:
 
     def get_all_valid_moves(self, color):
         """
-        Returns all the valid moves for a given color (player)
+        Returns all the valid moves for a given color (player). The list is
+        cached with the position until the board changes, so the game-over
+        checks of every frame and the AI's move share one generation
         """
-        valid_moves = []
-
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                piece = self.get_piece(row, col)
-                if piece != 0 and piece.color == color:
-                    moves = self.board.get_valid_moves(piece.row, piece.col)
-                    for move in moves:
-                        valid_moves.append(((piece.row, piece.col), move))
-
-        return valid_moves
+        return self.board.legal_moves(color)
 
     def is_valid_move(self, row, col):
         """
@@ -126,30 +157,27 @@ class Game:
             return True
         return False
 
-    def show_text(self):
+    def human_won(self):
         """
-        Displays the game text at the end of the game
+        Checks whether the human player won the finished game
         """
-        won_text = FONT.render(f"Congratulations! You won!", True, (255, 255, 255))
-        lost_text = FONT.render(f"You lost! Try again next time!", True, (255, 255, 255))
-
         if self.player_turn == 2 and not self.get_all_valid_moves(self.board.RED) or self.black_score == 12:
-            self.win.blit(won_text, (150, 300))
-        else:
-            if self.game_won:
-                self.win.blit(won_text, (150, 300))
-            else:
-                self.win.blit(lost_text, (150, 300))
+            return True
+        return self.game_won
 
-        pygame.display.update()
+    def show_text(self):
+        """
+        Displays the game text at the end of the game
+        """
+        if self.renderer is not None:
+            self.renderer.show_text(self.human_won())
 
     def clone(self):
         """
-        Clones the current game
+        Clones the current game, with a copy-on-write snapshot of the board
         """
-        new_game = Game(self.win, self.player_1, self.player_2)
-        new_game.black_score = self.black_score
-        new_game.red_score = self.red_score
-        new_game.player_turn = self.player_turn
-        new_game.board = copy.deepcopy(self.board)
+        new_game = copy.copy(self)
+        new_game.board = self.board.clone()
+        new_game.ai_search = None
+        new_game.ai_move_task = None
         return new_game
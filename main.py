@@ -1,4 +1,6 @@
+import os
 import sys
+import pygame
 from game import *
 import asyncio
 from player import *
@@ -9,10 +11,19 @@ pygame.display.set_caption('Checkers')
 
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
+# Built with "python book.py opening.book"; the AI searches every move without it
+BOOK_PATH = 'opening.book'
+# Built with "python tablebase.py tablebase"; used once few pieces are left
+TABLEBASE_PATH = 'tablebase'
+# Frames per second the main loop is capped at
+FPS = 30
+# Shows the AI's nodes per second and search depth over the board
+SHOW_STATS = False
 
 player_1 = HumanPlayer(BLACK)
-player_2 = MinimaxPlayer(RED, depth=6)
-game = Game(screen, player_1, player_2)
+player_2 = MinimaxPlayer(RED, depth=6, book_path=BOOK_PATH if os.path.exists(BOOK_PATH) else None,
+                         tablebase_path=TABLEBASE_PATH if os.path.isdir(TABLEBASE_PATH) else None, stats=SHOW_STATS)
+game = Game(screen, player_1, player_2, show_stats=SHOW_STATS)
 game.update()
 
 
@@ -21,50 +32,48 @@ async def handle_event(event):
     Handles an event from the user
     """
     if event.type == pygame.QUIT:
+        game.cancel_ai_turn()
         pygame.quit()
         sys.exit()
 
+    elif event.type == pygame.WINDOWEXPOSED:
+        # Only changed squares are sent to the window, so repaint it whole
+        game.renderer.invalidate()
+
     elif event.type == pygame.MOUSEBUTTONDOWN and not game.is_over():
         mouse_pos = pygame.mouse.get_pos()
         row, col = game.get_mouse_position(mouse_pos)
 
         if game.player_turn == 1:
-            if game.board.selected_piece is not None and (row, col) not in game.board.valid_moves:
-                if game.board.jumped_piece is not None:
+            if game.board.selected_square is not None and (row, col) not in game.board.valid_moves:
+                if game.board.jumped_square is not None:
                     return
-                game.board.selected_piece = None
+                game.board.selected_square = None
                 game.player_turn = 1
                 return
             await move_player_1(row, col)
 
-        if game.board.selected_piece is None and game.player_turn == 2:
-            await asyncio.sleep(0.5)
-            await game.handle_ai_turn()
-            game.player_turn = 1
-            game.board.jumped_piece = None
-            game.board.selected_piece = None
-
 
 async def move_player_1(row, col):
     """
     Handles moving player 1 (the human player)
     """
-    if game.board.jumped_piece is not None:
+    if game.board.jumped_square is not None:
         if (row, col) in game.board.valid_moves:
             game.board.select_and_move(row, col)
         else:
             return
-    if game.board.selected_piece is None:
+    if game.board.selected_square is None:
         game.board.select(row, col, game.board.BLACK)
     else:
         game.board.select_and_move(row, col)
-        if game.board.jumped_piece is not None:
-            game.board.delete_piece(game.board.jumped_piece.row, game.board.jumped_piece.col)
+        if game.board.jumped_square is not None:
+            game.board.delete_piece(*game.board.jumped_square)
             game.black_score += 1
 
             if not game.board.get_valid_moves_after_jump(row, col):
-                game.board.selected_piece = None
-                game.board.jumped_piece = None
+                game.board.selected_square = None
+                game.board.jumped_square = None
                 game.player_turn = 2
             else:
                 game.board.valid_moves = game.board.get_valid_moves_after_jump(row, col)
@@ -76,14 +85,19 @@ async def move_player_1(row, col):
 
 
 async def main():
+    clock = pygame.time.Clock()
     while True:
         for event in pygame.event.get():
             await handle_event(event)
 
+        if game.board.selected_square is None:
+            game.poll_ai_turn()
+
         if game.is_over():
             game.show_text()
         else:
             game.update()
+        clock.tick(FPS)
         await asyncio.sleep(0)
 
 
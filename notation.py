@@ -0,0 +1,185 @@
+import struct
+from bitboard import BitBoard
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+# Binary encoding: black, red and king masks followed by the side to move
+ENCODING = struct.Struct('<IIIB')
+ENCODED_SIZE = ENCODING.size
+
+# PDN colour letters: black moves first from squares 1-12 and red, the
+# PDN "white" side, starts on squares 21-32
+COLOR_LETTERS = {'B': BLACK, 'W': RED}
+
+
+def square_index(number):
+    """
+    Returns the bitboard square of a PDN square number (1-32). Square 1 is
+    in black's back row, so the numbering runs from black's side
+    """
+    if not 1 <= number <= 32:
+        raise ValueError(f"square {number} is not between 1 and 32")
+    return 32 - number
+
+
+def square_number(square):
+    """
+    Returns the PDN square number (1-32) of a bitboard square
+    """
+    return 32 - square
+
+
+def parse_squares(text):
+    """
+    Returns the (square, king) pairs of a comma separated PDN square list
+    such as "K3,5,9-12"
+    """
+    pieces = []
+    for item in filter(None, text.split(',')):
+        king = item.startswith('K')
+        if king:
+            item = item[1:]
+        first, _, last = item.partition('-')
+        for number in range(int(first), int(last or first) + 1):
+            pieces.append((square_index(number), king))
+    return pieces
+
+
+def parse_fen(text):
+    """
+    Parses a PDN-style FEN such as "B:W21-32:B1-12" into a bitboard
+    position and the color to move
+    """
+    fields = text.strip().strip('"').rstrip('.').split(':')
+    if len(fields) != 3 or fields[0].upper() not in COLOR_LETTERS:
+        raise ValueError(f"malformed FEN {text!r}")
+    masks = {BLACK: 0, RED: 0}
+    kings = 0
+    for field in fields[1:]:
+        if not field or field[0].upper() not in COLOR_LETTERS:
+            raise ValueError(f"malformed piece list {field!r} in FEN {text!r}")
+        color = COLOR_LETTERS[field[0].upper()]
+        for square, king in parse_squares(field[1:]):
+            if (masks[BLACK] | masks[RED]) >> square & 1:
+                raise ValueError(f"square {32 - square} is listed twice in FEN {text!r}")
+            masks[color] |= 1 << square
+            if king:
+                kings |= 1 << square
+    return BitBoard(masks[BLACK], masks[RED], kings), COLOR_LETTERS[fields[0].upper()]
+
+
+def board_from_fen(text):
+    """
+    Returns a Board with the position of a PDN-style FEN and the color to move
+    """
+    position, color = parse_fen(text)
+    return position.to_board(), color
+
+
+def format_squares(mask, kings):
+    """
+    Returns the comma separated PDN square list of the pieces in a mask
+    """
+    items = []
+    for square in range(31, -1, -1):
+        if mask >> square & 1:
+            number = square_number(square)
+            items.append(f"K{number}" if kings >> square & 1 else str(number))
+    return ','.join(items)
+
+
+def to_fen(position, color):
+    """
+    Returns the PDN-style FEN of a bitboard position with the color to move
+    """
+    turn = 'B' if color == BLACK else 'W'
+    return f"{turn}:W{format_squares(position.red, position.kings)}:B{format_squares(position.black, position.kings)}"
+
+
+def board_to_fen(board, color):
+    """
+    Returns the PDN-style FEN of a Board with the color to move
+    """
+    return to_fen(BitBoard.from_board(board), color)
+
+
+def encode(position, color):
+    """
+    Returns the fixed-size binary encoding of a bitboard position and the
+    color to move. The bytes are hashable and compare equal exactly when
+    the positions do, so they can be used as dict and cache keys
+    """
+    return ENCODING.pack(position.black, position.red, position.kings, 0 if color == BLACK else 1)
+
+
+def decode(data):
+    """
+    Returns the bitboard position and color to move of a binary encoding
+    """
+    black, red, kings, side = ENCODING.unpack(data)
+    if black & red or kings & ~(black | red) or side > 1:
+        raise ValueError(f"invalid position encoding {data.hex()}")
+    return BitBoard(black, red, kings), BLACK if side == 0 else RED
+
+
+def encode_board(board, color):
+    """
+    Returns the binary encoding of a Board with the color to move
+    """
+    return encode(BitBoard.from_board(board), color)
+
+
+def decode_board(data):
+    """
+    Returns the Board and color to move of a binary encoding
+    """
+    position, color = decode(data)
+    return position.to_board(), color
+
+
+def game_color(game):
+    """
+    Returns the color whose turn it is in a game
+    """
+    return BLACK if game.player_turn == 1 else RED
+
+
+def set_game_position(game, board, color):
+    """
+    Puts a game in the given position, with the captures counted from the
+    pieces missing from each side
+    """
+    game.board = board
+    game.player_turn = 1 if color == BLACK else 2
+    game.black_score = 12 - board.piece_count(RED)
+    game.red_score = 12 - board.piece_count(BLACK)
+    return game
+
+
+def game_to_fen(game):
+    """
+    Returns the PDN-style FEN of a game's position and side to move
+    """
+    return board_to_fen(game.board, game_color(game))
+
+
+def game_from_fen(game, text):
+    """
+    Puts a game in the position of a PDN-style FEN
+    """
+    return set_game_position(game, *board_from_fen(text))
+
+
+def encode_game(game):
+    """
+    Returns the binary encoding of a game's position and side to move
+    """
+    return encode_board(game.board, game_color(game))
+
+
+def decode_game(game, data):
+    """
+    Puts a game in the position of a binary encoding
+    """
+    return set_game_position(game, *decode_board(data))
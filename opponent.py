@@ -0,0 +1,82 @@
+import math
+from ordering import is_capture
+
+
+class UniformModel:
+    """
+    Opponent model that plays every legal move with the same probability
+    """
+
+    def probabilities(self, player, position, moves):
+        """
+        Returns the probability of each move
+        """
+        return [1 / len(moves)] * len(moves)
+
+
+class CapturesPreferredModel:
+    """
+    Opponent model that plays captures more often than quiet moves, in
+    proportion to the number of pieces they take
+    """
+
+    def __init__(self, capture_weight=4):
+        """
+        Initializes the model; a capture of one piece is capture_weight
+        times as likely as a quiet move
+        """
+        self.capture_weight = capture_weight
+
+    def probabilities(self, player, position, moves):
+        """
+        Returns the probability of each move
+        """
+        weights = [self.capture_weight * position.capture_count(move) if is_capture(move) else 1 for move in moves]
+        total = sum(weights)
+        return [weight / total for weight in weights]
+
+
+class SoftmaxModel:
+    """
+    Opponent model that prefers moves leading to positions the player's
+    heuristic scores badly for the player, through a softmax over the
+    scores of the positions after each move
+    """
+
+    def __init__(self, temperature=1.0):
+        """
+        Initializes the model; lower temperatures make the opponent greedier
+        """
+        self.temperature = temperature
+
+    def probabilities(self, player, position, moves):
+        """
+        Returns the probability of each move
+        """
+        scores = []
+        for move in moves:
+            undo = position.make_move(move)
+            scores.append(-player.evaluate(position) / self.temperature)
+            position.unmake_move(undo)
+        top = max(scores)
+        weights = [math.exp(score - top) for score in scores]
+        total = sum(weights)
+        return [weight / total for weight in weights]
+
+
+OPPONENT_MODELS = {
+    'uniform': UniformModel,
+    'captures': CapturesPreferredModel,
+    'softmax': SoftmaxModel,
+}
+
+
+def opponent_model(model):
+    """
+    Returns the opponent model for a model name, or the model itself
+    """
+    if isinstance(model, str):
+        if model not in OPPONENT_MODELS:
+            raise ValueError(f"Unknown opponent model {model!r}, expected one of {', '.join(OPPONENT_MODELS)}")
+        return OPPONENT_MODELS[model]()
+    return model
@@ -0,0 +1,73 @@
+MAX_PLY = 64
+
+
+def is_capture(move):
+    """
+    Checks whether a move starts with a jump
+    """
+    return abs(move[0][0] - move[1][0]) == 2
+
+
+class MoveOrderer:
+    """
+    Orders moves for alpha-beta search: the table and previous best moves
+    first, then captures by how many pieces they take, then the killer
+    moves of the ply and finally the quiet moves by history score. The
+    root is ordered without killers and history, which a root-parallel
+    search cannot share with its workers, so that it orders the root the
+    same way as the serial search
+    """
+
+    def __init__(self):
+        """
+        Initializes empty killer and history tables
+        """
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+
+    def new_search(self):
+        """
+        Clears the killers and ages the history scores before a root search
+        """
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+
+    def order(self, position, moves, ply, first_moves=()):
+        """
+        Returns the moves in the order they should be searched
+        """
+        captures = []
+        quiet = []
+        for move in moves:
+            if is_capture(move):
+                captures.append((position.capture_count(move), move))
+            else:
+                quiet.append(move)
+        captures.sort(key=lambda capture: capture[0], reverse=True)
+
+        ordered_killers = []
+        if ply > 0:
+            killers = self.killers[ply] if ply < MAX_PLY else ()
+            ordered_killers = [move for move in killers if move is not None and move in quiet]
+            quiet = [move for move in quiet if move not in ordered_killers]
+            quiet.sort(key=lambda move: self.history.get(move, 0), reverse=True)
+
+        ordered = [move for _, move in captures] + ordered_killers + quiet
+        for move in reversed(first_moves):
+            if move is not None and move in ordered:
+                ordered.remove(move)
+                ordered.insert(0, move)
+        return ordered
+
+    def record_cutoff(self, move, ply, depth):
+        """
+        Remembers a quiet move that caused a beta cutoff
+        """
+        if is_capture(move):
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
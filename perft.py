@@ -0,0 +1,97 @@
+import argparse
+import sys
+import time
+from notation import parse_fen
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+# Test positions with their perft counts for depths 1, 2, ... under the
+# English draughts rules: capturing is mandatory, a move is a complete
+# capture sequence and a man crowned by a jump ends its move. The start
+# position counts are the published ones for the game
+REFERENCE_POSITIONS = [
+    ('start', 'B:W21-32:B1-12', [7, 49, 302, 1469, 7361, 36768, 179740]),
+    ('opening', 'W:W21-32:B1-8,10-12,15', [7, 35, 159, 741, 3635, 16857, 79095]),
+    ('midgame', 'B:W18,20,21,23-26,28,30-32:B1-3,5-7,9,11,13,14,16', [7, 36, 176, 662, 2726, 9086, 33455, 115633]),
+    ('double jump', 'B:W14,15,22,23,30:B6,7,10,11', [4, 8, 20, 72, 313, 1129, 4759, 17390, 74157, 278936]),
+    ('kings', 'W:WK21,K25,30:BK5,K10,3', [4, 32, 209, 1550, 8472, 59511]),
+    ('kings vs men', 'B:WK14,K19,28,29:B6,9,11,K18', [7, 15, 53, 213, 885, 4515, 20133, 110959]),
+]
+
+
+def perft(position, color, depth):
+    """
+    Counts the positions reached after depth moves
+    """
+    moves = position.get_all_valid_moves(color)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    opponent = RED if color == BLACK else BLACK
+    nodes = 0
+    for move in moves:
+        undo = position.make_move(move)
+        nodes += perft(position, opponent, depth - 1)
+        position.unmake_move(undo)
+    return nodes
+
+
+def divide(position, color, depth):
+    """
+    Returns the perft count below each move, to find where two move
+    generators disagree
+    """
+    opponent = RED if color == BLACK else BLACK
+    counts = {}
+    for move in position.get_all_valid_moves(color):
+        undo = position.make_move(move)
+        counts[move] = perft(position, opponent, depth - 1)
+        position.unmake_move(undo)
+    return counts
+
+
+def load_position(fen, backend):
+    """
+    Returns the position of a FEN on the given backend and the color to move
+    """
+    position, color = parse_fen(fen)
+    return (position.to_board() if backend == 'board' else position), color
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes and check them against reference counts")
+    parser.add_argument('--depth', type=int, default=None, help='deepest depth to run (default: every stored depth)')
+    parser.add_argument('--backend', choices=('bitboard', 'board'), default='bitboard')
+    parser.add_argument('--fen', default=None, help='count a custom position instead of the reference positions')
+    parser.add_argument('--divide', action='store_true', help='with --fen, print the count below every move')
+    args = parser.parse_args(argv)
+
+    if args.fen is not None:
+        position, color = load_position(args.fen, args.backend)
+        depth = args.depth or 1
+        if args.divide:
+            for move, count in divide(position, color, depth).items():
+                print(f"{move}: {count}")
+        start = time.perf_counter()
+        print(f"perft({depth}) = {perft(position, color, depth)} in {time.perf_counter() - start:.3f}s")
+        return 0
+
+    failures = 0
+    print(f"{'position':<16}{'depth':>6}{'nodes':>12}{'expected':>12}{'nodes/sec':>12}")
+    for name, fen, expected_counts in REFERENCE_POSITIONS:
+        position, color = load_position(fen, args.backend)
+        for depth, expected in enumerate(expected_counts[:args.depth], 1):
+            start = time.perf_counter()
+            nodes = perft(position, color, depth)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            status = ''
+            if nodes != expected:
+                status = '  MISMATCH'
+                failures += 1
+            print(f"{name:<16}{depth:>6}{nodes:>12}{expected:>12}{nodes / elapsed:>12.0f}{status}")
+    print("all counts match" if failures == 0 else f"{failures} counts do not match", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
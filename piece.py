@@ -1,64 +1,48 @@
-import pygame
-
-
 class Piece:
     """
-    Class consisting of all elements required for a piece in the game Checkers
+    Class consisting of all elements required for a piece in the game Checkers.
+    Pieces are immutable and only know their color and whether they are
+    kings, so there is one shared instance of each kind; the board keeps
+    track of where they stand
     """
-    PADDING = 5
-    OUTLINE = 15
+    __slots__ = ('color', 'king')
+    instances = {}
 
-    def __init__(self, row, col, color, king=False):
+    def __new__(cls, color, king=False):
         """
-        Initializes the piece with the given information
+        Returns the shared piece of the given color and kind
         """
-        self.row = row
-        self.col = col
-        self.color = color
-        self.king = king
+        piece = cls.instances.get((color, king))
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            object.__setattr__(piece, 'king', bool(king))
+            cls.instances[(color, bool(king))] = piece
+        return piece
 
-    def make_king(self):
-        """
-        Makes the piece a king
-        """
-        self.king = True
+    def __setattr__(self, name, value):
+        raise AttributeError("pieces are immutable")
 
-    def draw(self, win):
+    def __reduce__(self):
         """
-        Draws the piece on the board
+        Pickles and copies as a lookup of the shared piece
         """
-        radius = 600 // 8 // 2 - self.PADDING
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        if self.king:
-            image = pygame.image.load("crown.png")
-            image = pygame.transform.scale(image, (radius * 2, radius * 2))
-            win.blit(image, (self.x - radius, self.y - radius))
+        return Piece, (self.color, self.king)
 
-    def move(self, row, col):
-        """
-        Moves the piece
-        """
-        self.row = row
-        self.col = col
-        if (self.color == (0, 0, 0) and row == 0) or (self.color == (255, 0, 0) and row == 7):
-            self.make_king()
-
-    @property
-    def x(self):
-        """
-        Returns the x coordinate of the piece
-        """
-        return self.col * 600 // 8 + 600 // 8 // 2
+    def __repr__(self):
+        return f"Piece({self.color}, king={self.king})"
 
-    @property
-    def y(self):
+    def crowned(self):
         """
-        Returns the y coordinate of the piece
+        Returns the king of the piece's color
         """
-        return self.row * 600 // 8 + 600 // 8 // 2
+        return Piece(self.color, True)
 
-    def clone(self):
+    def moved_to(self, row):
         """
-        Returns a clone of the piece
+        Returns the piece after it moves to the given row, where a man
+        reaching the far row becomes a king
         """
-        return Piece(self.row, self.col, self.color, self.king)
+        if not self.king and ((self.color == (0, 0, 0) and row == 0) or (self.color == (255, 0, 0) and row == 7)):
+            return self.crowned()
+        return self
@@ -1,8 +1,71 @@
+import asyncio
+import concurrent.futures
+import math
+import random
 import time
+from bitboard import BitBoard
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from zobrist import side_key
+from ordering import MoveOrderer, is_capture
+from opponent import opponent_model as opponent_model_for
 
 KING_VALUE = 2
 PIECE_VALUE = 1
 CENTER_VALUE = 2
+# Score of a position the tablebase proves won, minus the plies to the win
+TABLEBASE_WIN = 1000
+HEURISTICS = ('first', 'second', 'third')
+MAX_DEPTH = 32
+EXPECTIMAX_PRUNING = (None, 'star1', 'star2')
+# Deepest capture sequence the quiescence search follows from a leaf
+QUIESCENCE_DEPTH = 8
+# Plies a Monte Carlo rollout plays before the heuristic decides the result
+ROLLOUT_LIMIT = 80
+# Simulations per move of a Monte Carlo player without a time budget
+MCTS_ITERATIONS = 1000
+# Profilers that can record where a search spends its time
+PROFILERS = (None, 'cprofile', 'sampling')
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget for a move runs out
+    """
+
+
+class SearchCancelled(Exception):
+    """
+    Raised inside the search when it was stopped from another thread. It
+    is not a timeout: a cancelled search has no move to return
+    """
+
+
+def search_root_move(player, position, move, depth, alpha, collect_stats=False):
+    """
+    Searches a single root move in a worker process and returns its value
+    (an upper bound when it is not above alpha), the number of nodes
+    searched and the search statistics, or None when they are not collected
+    """
+    position = player.worker_position(position, collect_stats)
+    position.make_move(move)
+    eval, _ = player.minimax(position, depth - 1, alpha, float('inf'), False, ply=1)
+    return eval, player.nodes, player.worker_stats()
+
+
+def search_mcts_root(player, position, iterations, time_budget_ms, seed, collect_stats=False):
+    """
+    Runs an independent Monte Carlo search from the root in a worker
+    process and returns the visits, wins and line of most visited moves of
+    each root move, the number of simulations played, the depth the tree
+    reached and the search statistics, or None when they are not collected
+    """
+    player.random.seed(seed)
+    position = player.worker_position(position, collect_stats)
+    root = player.new_root(position)
+    player.run_simulations(root, position, iterations, time_budget_ms)
+    statistics = [(child.move, child.visits, child.wins, [child.move] + player.most_visited_line(child))
+                  for child in root.children]
+    return statistics, player.nodes, player.depth_reached, player.worker_stats()
 
 
 class Player:
@@ -26,102 +89,267 @@ class AIPlayer(Player):
     Base AI player class that contains all the functions necessary
     for both Minimax and Expectimax agents
     """
-    def __init__(self, color):
+    def __init__(self, color, backend='bitboard', heuristic='second', stats=False, stats_log=None, profile=None):
         super().__init__(color)
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {', '.join(HEURISTICS)}")
+        if profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profile!r}, expected one of {', '.join(map(str, PROFILERS))}")
+        self.backend = backend
+        self.heuristic = heuristic
+        self.nodes = 0
+        self.deadline = None
+        self.stop_requested = False
+        # Process pool of a parallel search, started on its first search
+        self.executor = None
+        # Search statistics are only collected when asked for, since timing
+        # every move generation and evaluation slows the search down
+        self.collect_stats = stats or stats_log is not None or profile is not None
+        self.stats_log = stats_log
+        self.profile = profile
+        self.last_stats = None
+        # Statistics of the running search, counting the nodes it enters at each depth
+        self.search_stats = None
+        self.clone_seconds = 0.0
+        self.score = None
+        self.depth_reached = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
 
-    def execute_multijump_for_clone(self, game, jumped_piece, move):
+    def __getstate__(self):
         """
-        Executes moves after a jump only for the cloned game
+        Leaves the process pool out when the player is sent to a worker process
         """
-        game.board.delete_piece(jumped_piece[0], jumped_piece[1])
-        next_jump = move
-        while True:
-            next_jump = self.get_next_jump_move(game, next_jump)
-            if next_jump is None:
-                break
-            game.board.make_move(next_jump)
-            jumped_piece = game.get_jumped_piece(next_jump)
-            game.board.delete_piece(jumped_piece[0], jumped_piece[1])
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
 
-    def get_next_jump_move(self, game, move):
+    def close(self):
         """
-        Returns a list of possible continuation jumps after a jump for the original game
+        Shuts down the worker processes of a parallel player
         """
-        current_piece_row, current_piece_col = move[1][0], move[1][1]
-        piece = game.board.get_piece(current_piece_row, current_piece_col)
-        valid_moves = game.board.get_valid_moves(piece.row, piece.col)
-        for next_move in valid_moves:
-            if abs(current_piece_row - next_move[0]) == 2:
-                return (current_piece_row, current_piece_col), next_move
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
 
-        return None
+    def worker_pool(self):
+        """
+        Returns the process pool of a parallel player, starting it the first time
+        """
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def wait_for_workers(self, futures):
+        """
+        Waits until the worker processes finish, cancelling their remaining
+        work when the search is stopped or runs out of time
+        """
+        try:
+            pending = set(futures)
+            while pending:
+                _, pending = concurrent.futures.wait(pending, timeout=0.05)
+                self.check_stop()
+        except (SearchTimeout, SearchCancelled):
+            for future in futures:
+                future.cancel()
+            raise
+
+    def stop(self):
+        """
+        Asks a search running in another thread to stop as soon as possible
+        """
+        self.stop_requested = True
+
+    def check_stop(self):
+        """
+        Raises when the search was cancelled or ran out of time
+        """
+        if self.stop_requested:
+            raise SearchCancelled()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def search_position(self, game):
+        """
+        Returns a private copy of the game position that the search
+        makes and unmakes moves on in place
+        """
+        start = time.perf_counter()
+        if self.backend == 'board':
+            position = game.board.clone()
+        else:
+            position = BitBoard.from_board(game.board)
+        self.clone_seconds = time.perf_counter() - start
+        return position
+
+    def multijump_steps(self, game, move):
+        """
+        Executes a move one hop at a time along its path, yielding how long
+        each capture should stay on screen
+        """
+        for index, hop in enumerate(zip(move, move[1:])):
+            game.board.make_move(hop)
+            if game.get_jumped_piece(hop):
+                game.red_score += 1
+                yield 1 if index == 0 else 0.5
 
     def execute_multijump(self, game, move):
         """
         Executes a jump and all the jumps after it if there are any
         """
-        game.board.make_move(move)
-        jumped_piece = game.get_jumped_piece(move)
+        for delay in self.multijump_steps(game, move):
+            if game.renderer is not None:
+                game.update()
+                time.sleep(delay)
 
-        if jumped_piece:
-            game.board.delete_piece(jumped_piece[0], jumped_piece[1])
-            game.red_score += 1
+    async def execute_multijump_async(self, game, move):
+        """
+        Executes a jump and all the jumps after it, waiting on asyncio
+        timers so that the event loop keeps running between hops
+        """
+        for delay in self.multijump_steps(game, move):
             game.update()
-            time.sleep(1)
-            next_jump = move
+            await asyncio.sleep(delay)
 
-            while True:
-                next_jump = self.get_next_jump_move(game, next_jump)
-                if next_jump is None:
-                    break
-                game.board.make_move(next_jump)
-                jumped_piece = game.get_jumped_piece(next_jump)
-                game.board.delete_piece(jumped_piece[0], jumped_piece[1])
-                game.red_score += 1
-                game.update()
-                time.sleep(0.5)
+    def get_move(self, game):
+        """
+        Executes the best move
+        """
+        if game.is_over():
+            game.show_text()
+            return
+        self.stop_requested = False
+        moves = game.get_all_valid_moves(self.color)
+        if len(moves) == 1:
+            best_move = moves[0]
+        else:
+            best_move = self.think(self.search_position(game))
+        self.execute_multijump(game, best_move)
 
-    def evaluate(self, game):
+    def choose_move(self, position, time_budget_ms=None):
         """
-        Evaluates the game against the player's moves
+        Returns the move to play from a private copy of the position
         """
-        return self.evaluate_second(game)
+        best_move = self.search(position, time_budget_ms)
+        if best_move is None:
+            best_move = position.get_all_valid_moves(self.color)[0]
+        return best_move
 
-    def evaluate_first(self, game):
-        ai_pieces = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color == self.color)
-        opponent_pieces = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color != self.color)
+    def think(self, position, time_budget_ms=None):
+        """
+        Returns the move to play from a private copy of the position like
+        choose_move. With stats enabled the search runs on an instrumented
+        copy, its statistics are kept in last_stats and appended to the
+        stats log, and the profiler, if any, records where the time went
+        """
+        if not self.collect_stats:
+            return self.choose_move(position, time_budget_ms)
+        from telemetry import SearchStats, instrument, profile_call
+        stats = SearchStats(self)
+        stats.clone_seconds = self.clone_seconds
+        self.clone_seconds = 0.0
+        self.score = None
+        self.evaluate = stats.timed_evaluation(self.evaluate)
+        self.search_stats = stats
+        start = time.perf_counter()
+        try:
+            best_move, stats.profile = profile_call(self.profile, self.choose_move, instrument(position, stats), time_budget_ms)
+        finally:
+            del self.evaluate
+            self.search_stats = None
+        stats.finish(self, position, best_move, time.perf_counter() - start)
+        self.last_stats = stats
+        if self.stats_log is not None:
+            stats.write(self.stats_log)
+        return best_move
+
+    def worker_position(self, position, collect_stats):
+        """
+        Returns the position a worker process searches. When the parent
+        search collects statistics, the worker player records its own the
+        way think does and the position is instrumented for them
+        """
+        if not collect_stats:
+            return position
+        from telemetry import SearchStats, instrument
+        self.search_stats = SearchStats(self)
+        self.evaluate = self.search_stats.timed_evaluation(self.evaluate)
+        return instrument(position, self.search_stats)
+
+    def worker_stats(self):
+        """
+        Returns the statistics a worker process recorded with its cutoffs,
+        or None when it did not record any
+        """
+        stats = self.search_stats
+        if stats is not None:
+            stats.cutoffs = self.cutoffs
+            stats.first_move_cutoffs = self.first_move_cutoffs
+        return stats
+
+    def merge_worker_stats(self, stats):
+        """
+        Adds the statistics of a worker process to those of the running search
+        """
+        if stats is None or self.search_stats is None:
+            return
+        self.search_stats.merge(stats)
+        self.cutoffs += stats.cutoffs
+        self.first_move_cutoffs += stats.first_move_cutoffs
+
+    def principal_variation(self, position, move):
+        """
+        Returns the moves the search expects to be played from the position,
+        starting with the chosen move
+        """
+        return [move]
+
+    def evaluate(self, position):
+        """
+        Evaluates the position against the player's moves
+        with the player's heuristic
+        """
+        if self.heuristic == 'second':
+            return self.evaluate_second(position)
+        if self.heuristic == 'first':
+            return self.evaluate_first(position)
+        return self.evaluate_third(position)
+
+    def evaluate_first(self, position):
+        ai_pieces = position.piece_count(self.color)
+        opponent_pieces = position.piece_count(self.opponent_color())
 
         return ai_pieces - opponent_pieces
 
-    def evaluate_second(self, game):
-        ai_pieces = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color == self.color)
-        opponent_pieces = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color != self.color)
+    def evaluate_second(self, position):
+        ai_pieces = position.piece_count(self.color)
+        opponent_pieces = position.piece_count(self.opponent_color())
 
-        ai_kings = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color == self.color and piece.king)
-        opponent_kings = sum(1 for row in game.board.board for piece in row if piece != 0 and piece.color != self.color and piece.king)
+        ai_kings = position.king_count(self.color)
+        opponent_kings = position.king_count(self.opponent_color())
 
         piece_score = (ai_pieces - opponent_pieces) * PIECE_VALUE
         king_score = (ai_kings - opponent_kings) * KING_VALUE
 
         return piece_score + king_score
 
-    def evaluate_third(self, game):
-        center_positions = [(3, 3), (3, 4), (4, 3), (4, 4)]
-
-        agent_score = 0
-        opponent_score = 0
-
-        for row in range(game.board.ROWS):
-            for col in range(game.board.COLS):
-                piece = game.board.get_piece(row, col)
-                if piece != 0:
-                    if piece.color == game.board.BLACK and (piece.row, piece.col) in center_positions:
-                        opponent_score += CENTER_VALUE
-                    elif piece.color == game.board.RED and (piece.row, piece.col) in center_positions:
-                        agent_score += CENTER_VALUE
+    def evaluate_third(self, position):
+        agent_score = position.center_count(self.color) * CENTER_VALUE
+        opponent_score = position.center_count(self.opponent_color()) * CENTER_VALUE
 
         return agent_score - opponent_score
 
+    def evaluation_bound(self):
+        """
+        Returns the largest absolute value the player's heuristic can give
+        """
+        if self.heuristic == 'second':
+            return 12 * (PIECE_VALUE + KING_VALUE)
+        if self.heuristic == 'first':
+            return 12
+        return 4 * CENTER_VALUE
+
     def opponent_color(self):
         """
         Returns the color of the opponents pieces
@@ -133,123 +361,826 @@ class MinimaxPlayer(AIPlayer):
     """
     Class for the Minimax agent
     """
-    def __init__(self, color, depth):
-        super().__init__(color)
+    def __init__(self, color, depth=None, backend='bitboard', tt_size=1 << 16, time_budget_ms=None, move_ordering=True,
+                 workers=1, heuristic='second', book_path=None, tablebase_path=None, quiescence=False, quiescence_limit=64,
+                 pvs=False, aspiration_window=None, stats=False, stats_log=None, profile=None):
+        super().__init__(color, backend, heuristic, stats, stats_log, profile)
+        if depth is None and time_budget_ms is None:
+            raise ValueError("MinimaxPlayer needs a depth, a time budget or both")
         self.depth = depth
+        self.time_budget_ms = time_budget_ms
+        self.tt_size = tt_size
+        self.transposition_table = TranspositionTable(tt_size) if tt_size else None
+        self.orderer = MoveOrderer() if move_ordering else None
+        self.workers = workers
+        self.book = None
+        if book_path is not None:
+            from book import OpeningBook
+            self.book = OpeningBook(book_path)
+        self.tablebase_path = tablebase_path
+        self.tablebase = None
+        if tablebase_path is not None:
+            from tablebase import Tablebase
+            self.tablebase = Tablebase(tablebase_path)
+        self.quiescence = quiescence
+        self.quiescence_limit = quiescence_limit
+        self.quiescence_budget = 0
+        self.quiescence_nodes = 0
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.researches = 0
 
-    def get_move(self, game):
+    def __getstate__(self):
         """
-        Executes the best move
+        Leaves the process pool and the book out when the player is sent to
+        a worker process
+        """
+        state = super().__getstate__()
+        state['book'] = None
+        return state
+
+    def worker_copy(self):
+        """
+        Returns a serial player with the same settings and empty tables,
+        cheap to send to a worker process
+        """
+        return MinimaxPlayer(self.color, self.depth, self.backend, self.tt_size, move_ordering=self.orderer is not None,
+                             heuristic=self.heuristic, tablebase_path=self.tablebase_path, quiescence=self.quiescence,
+                             quiescence_limit=self.quiescence_limit, pvs=self.pvs)
+
+    def close(self):
+        """
+        Shuts down the worker processes of a parallel player and closes the book
+        """
+        super().close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+    def get_move(self, game, time_budget_ms=None):
+        """
+        Executes the best move, searching for at most time_budget_ms
+        milliseconds when a budget is given here or to the constructor
         """
         if game.is_over():
             game.show_text()
             return
-        _, best_move = self.minimax(game, depth=self.depth, alpha=-float('inf'), beta=float('inf'), maximizing_player=True)
-        if best_move is None:
-            best_move = game.get_all_valid_moves(self.color)[0]
+        self.stop_requested = False
+        moves = game.get_all_valid_moves(self.color)
+        if len(moves) == 1:
+            best_move = moves[0]
+        else:
+            best_move = self.think(self.search_position(game), time_budget_ms)
         self.execute_multijump(game, best_move)
 
-    def minimax(self, game, depth, alpha, beta, maximizing_player):
+    def choose_move(self, position, time_budget_ms=None):
         """
-        Executes the minimax algorithm
+        Returns the move to play from a private copy of the position,
+        taken from the opening book when the position is in it
         """
-        if depth == 0:
-            return self.evaluate(game), None
-
-        if maximizing_player:
-            max_eval = -float('inf')
-            best_move = None
-            for move in game.get_all_valid_moves(self.color):
-                game_copy = game.clone()
-                game_copy.board.make_move(move)
-                jumped_piece = game.get_jumped_piece(move)
-                if jumped_piece:
-                    self.execute_multijump_for_clone(game_copy, jumped_piece, move)
-
-                eval, _ = self.minimax(game_copy, depth - 1, alpha, beta, False)
-                if eval > max_eval:
-                    max_eval = eval
+        if self.book is not None:
+            book_move = self.book.choose(position, self.color)
+            if book_move is not None:
+                self.nodes = 0
+                self.depth_reached = 0
+                return book_move
+        if self.tablebase is not None:
+            tablebase_move = self.tablebase.best_move(position, self.color)
+            if tablebase_move is not None:
+                self.nodes = 0
+                self.depth_reached = 0
+                return tablebase_move
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        best_move = self.search(position, time_budget_ms)
+        if best_move is None:
+            best_move = position.get_all_valid_moves(self.color)[0]
+        return best_move
+
+    def search(self, position, time_budget_ms=None):
+        """
+        Returns the best move for the position, searched to the fixed depth
+        or by iterative deepening within the time budget or with aspiration
+        windows
+        """
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.researches = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.score = None
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        if self.orderer is not None:
+            self.orderer.new_search()
+        if time_budget_ms is None and self.aspiration_window is None:
+            if self.workers > 1:
+                self.score, best_move = self.parallel_search(position, self.depth)
+            else:
+                self.score, best_move = self.minimax(position, depth=self.depth, alpha=-float('inf'), beta=float('inf'), maximizing_player=True)
+            self.depth_reached = self.depth
+            return best_move
+        return self.iterative_deepening(position, time_budget_ms)
+
+    def parallel_search(self, position, depth):
+        """
+        Searches the first root move here to get a bound, then splits the
+        remaining root moves across worker processes. The root is ordered
+        as in minimax and a move is only chosen when it is strictly better
+        than every move before it, so with the transposition table off the
+        result is the move the serial search picks
+        """
+        moves = position.get_all_valid_moves(self.color)
+        if depth == 0 or not moves:
+            return self.minimax(position, depth, -float('inf'), float('inf'), True)
+        table_move = None
+        if self.transposition_table is not None:
+            entry = self.transposition_table.probe(position.zobrist_key ^ side_key(self.color))
+            if entry is not None:
+                table_move = entry.move
+        if self.orderer is not None:
+            moves = self.orderer.order(position, moves, 0, (None, table_move))
+        elif table_move in moves:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        self.nodes += 1
+        if self.search_stats is not None:
+            self.search_stats.count_node(0)
+        undo = position.make_move(moves[0])
+        best_eval, _ = self.minimax(position, depth - 1, -float('inf'), float('inf'), False, ply=1)
+        position.unmake_move(undo)
+        best_move = moves[0]
+        if len(moves) == 1 or best_eval == float('inf'):
+            return best_eval, best_move
+
+        template = self.worker_copy()
+        executor = self.worker_pool()
+        collect_stats = self.search_stats is not None
+        futures = [executor.submit(search_root_move, template, position, move, depth, best_eval, collect_stats)
+                   for move in moves[1:]]
+        self.wait_for_workers(futures)
+
+        for move, future in zip(moves[1:], futures):
+            eval, nodes, stats = future.result()
+            self.nodes += nodes
+            self.merge_worker_stats(stats)
+            if eval > best_eval:
+                best_eval, best_move = eval, move
+        return best_eval, best_move
+
+    def iterative_deepening(self, position, time_budget_ms):
+        """
+        Searches depth 1, 2, 3... trying the previous iteration's best move
+        first, and returns the best move of the last depth that completed in
+        time, or of the fixed depth when there is no budget. With aspiration
+        windows each iteration first searches a narrow window around the
+        previous score. A timed-out iteration leaves the position
+        mid-search, so the position must be a private copy
+        """
+        start = time.perf_counter()
+        max_depth = self.depth or MAX_DEPTH
+        moves = position.get_all_valid_moves(self.color)
+        best_move = moves[0] if moves else None
+        self.depth_reached = 0
+        if len(moves) <= 1:
+            return best_move
+
+        # The first iteration always completes so that there is a searched move
+        self.deadline = None
+        try:
+            value = None
+            for depth in range(1, max_depth + 1):
+                if self.aspiration_window is not None and value is not None:
+                    alpha, beta = value - self.aspiration_window, value + self.aspiration_window
+                    value, move = self.minimax(position, depth, alpha, beta, True, first_move=best_move)
+                    if value <= alpha or value >= beta:
+                        self.researches += 1
+                        value, move = self.minimax(position, depth, -float('inf'), float('inf'), True, first_move=best_move)
+                else:
+                    value, move = self.minimax(position, depth, -float('inf'), float('inf'), True, first_move=best_move)
+                if move is not None:
                     best_move = move
-                alpha = max(alpha, eval)
-                if beta <= alpha:
+                self.score = value
+                self.depth_reached = depth
+                if time_budget_ms is not None:
+                    self.deadline = start + time_budget_ms / 1000
+                if abs(value) == float('inf') or self.deadline is not None and time.perf_counter() >= self.deadline:
                     break
-            return max_eval, best_move
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best_move
+
+    def minimax(self, position, depth, alpha, beta, maximizing_player, first_move=None, ply=0):
+        """
+        Executes the minimax algorithm, making and unmaking moves on the position
+        and sharing results between transpositions through the table
+        """
+        self.nodes += 1
+        if self.search_stats is not None:
+            self.search_stats.count_node(ply)
+        if self.nodes & 255 == 0:
+            self.check_stop()
+        if depth == 0:
+            if self.tablebase is not None and self.tablebase.covers(position):
+                score = self.tablebase_score(position, maximizing_player)
+                if score is not None:
+                    return score, None
+            if self.quiescence:
+                self.quiescence_budget = self.quiescence_limit
+                return self.quiescence_search(position, alpha, beta, maximizing_player, QUIESCENCE_DEPTH, ply), None
+            return self.evaluate(position), None
+
+        color = self.color if maximizing_player else self.opponent_color()
+        moves = position.get_all_valid_moves(color)
+
+        table = self.transposition_table
+        table_move = None
+        if table is not None:
+            key = position.zobrist_key ^ side_key(color)
+            entry = table.probe(key)
+            if entry is not None:
+                if entry.depth >= depth:
+                    if entry.flag == EXACT:
+                        return entry.value, entry.move
+                    if entry.flag == LOWER:
+                        alpha = max(alpha, entry.value)
+                    else:
+                        beta = min(beta, entry.value)
+                    if beta <= alpha:
+                        return entry.value, entry.move
+                table_move = entry.move
+            original_alpha, original_beta = alpha, beta
 
+        if self.orderer is not None:
+            moves = self.orderer.order(position, moves, ply, (first_move, table_move))
         else:
-            min_eval = float('inf')
-            best_move = None
-            for move in game.get_all_valid_moves(self.opponent_color()):
-                game_copy = game.clone()
-                game_copy.board.make_move(move)
-                jumped_piece = game.get_jumped_piece(move)
-                if jumped_piece:
-                    self.execute_multijump_for_clone(game_copy, jumped_piece, move)
-
-                eval, _ = self.minimax(game_copy, depth - 1, alpha, beta, True)
-                if eval < min_eval:
-                    min_eval = eval
+            for move in (table_move, first_move):
+                if move in moves:
+                    moves.remove(move)
+                    moves.insert(0, move)
+
+        best_eval = -float('inf') if maximizing_player else float('inf')
+        best_move = None
+        for index, move in enumerate(moves):
+            undo = position.make_move(move)
+            null_window = self.pvs and index > 0 and (alpha != -float('inf') if maximizing_player else beta != float('inf'))
+            if null_window:
+                # Only prove that the move is no better than the best so
+                # far, and search it again with the full window if it is
+                window = (alpha, alpha + 1) if maximizing_player else (beta - 1, beta)
+                eval, _ = self.minimax(position, depth - 1, *window, not maximizing_player, ply=ply + 1)
+                if alpha < eval < beta:
+                    self.researches += 1
+                    eval, _ = self.minimax(position, depth - 1, alpha, beta, not maximizing_player, ply=ply + 1)
+            else:
+                eval, _ = self.minimax(position, depth - 1, alpha, beta, not maximizing_player, ply=ply + 1)
+            position.unmake_move(undo)
+            if maximizing_player:
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval:
+                    best_eval = eval
                     best_move = move
                 beta = min(beta, eval)
-                if beta <= alpha:
-                    break
-            return min_eval, best_move
+            if beta <= alpha:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                if self.orderer is not None:
+                    self.orderer.record_cutoff(move, ply, depth)
+                break
+
+        if table is not None:
+            if best_eval <= original_alpha:
+                flag = UPPER
+            elif best_eval >= original_beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            table.store(key, depth, flag, best_eval, best_move)
+        return best_eval, best_move
+
+    def quiescence_search(self, position, alpha, beta, maximizing_player, depth, ply):
+        """
+        Searches only the captures from a leaf until the position is quiet,
+        so that it is not evaluated in the middle of an exchange. Capturing
+        is mandatory, so a side that can capture has no stand pat and must
+        play one of its captures. Each leaf may search at most
+        quiescence_limit nodes
+        """
+        if depth == 0 or self.quiescence_budget <= 0:
+            return self.evaluate(position)
+        color = self.color if maximizing_player else self.opponent_color()
+        captures = position.get_all_valid_moves(color)
+        if not captures or not is_capture(captures[0]):
+            return self.evaluate(position)
+        if len(captures) > 1:
+            captures.sort(key=position.capture_count, reverse=True)
+
+        best_eval = -float('inf') if maximizing_player else float('inf')
+        for move in captures:
+            if self.quiescence_budget <= 0:
+                break
+            self.quiescence_budget -= 1
+            self.quiescence_nodes += 1
+            self.nodes += 1
+            if self.search_stats is not None:
+                self.search_stats.count_node(ply + 1)
+            if self.nodes & 255 == 0:
+                self.check_stop()
+            undo = position.make_move(move)
+            eval = self.quiescence_search(position, alpha, beta, not maximizing_player, depth - 1, ply + 1)
+            position.unmake_move(undo)
+            if maximizing_player:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+        if abs(best_eval) == float('inf'):
+            # The budget ran out before any capture was searched
+            return self.evaluate(position)
+        return best_eval
+
+    def tablebase_score(self, position, maximizing_player):
+        """
+        Returns the exact score of a position from the tablebase, from the
+        player's point of view, or None when it is not in the tablebase
+        """
+        color = self.color if maximizing_player else self.opponent_color()
+        outcome = self.tablebase.probe(position, color)
+        if outcome is None:
+            return None
+        result, distance = outcome
+        if result == 'draw':
+            return 0
+        score = TABLEBASE_WIN - distance
+        return score if (result == 'win') == maximizing_player else -score
+
+    def principal_variation(self, position, move):
+        """
+        Returns the chosen move followed by the best moves stored in the
+        transposition table, as far as the search reached
+        """
+        variation = [move]
+        if self.transposition_table is None:
+            return variation
+        undos = [position.make_move(move)]
+        color = self.opponent_color()
+        seen = {position.zobrist_key ^ side_key(color)}
+        while len(variation) < self.depth_reached:
+            entry = self.transposition_table.probe(position.zobrist_key ^ side_key(color))
+            if entry is None or entry.move not in position.get_all_valid_moves(color):
+                break
+            variation.append(entry.move)
+            undos.append(position.make_move(entry.move))
+            color = self.color if color != self.color else self.opponent_color()
+            key = position.zobrist_key ^ side_key(color)
+            if key in seen:
+                break
+            seen.add(key)
+        for undo in reversed(undos):
+            position.unmake_move(undo)
+        return variation
 
 
 class ExpectimaxPlayer(AIPlayer):
     """
     Class for the Expectimax player
     """
-    def __init__(self, color, depth=5):
-        super().__init__(color)
+    def __init__(self, color, depth=5, backend='bitboard', heuristic='second', opponent_model='uniform', pruning=None,
+                 probability_mass=1.0, time_budget_ms=None, stats=False, stats_log=None, profile=None):
+        super().__init__(color, backend, heuristic, stats, stats_log, profile)
+        if pruning not in EXPECTIMAX_PRUNING:
+            raise ValueError(f"Unknown pruning {pruning!r}, expected one of {', '.join(map(str, EXPECTIMAX_PRUNING))}")
         self.depth = depth
+        self.opponent_model = opponent_model_for(opponent_model)
+        self.pruning = pruning
+        self.probability_mass = probability_mass
+        self.time_budget_ms = time_budget_ms
 
-    def get_move(self, game):
+    def choose_move(self, position, time_budget_ms=None):
         """
-        Executes the best move
+        Returns the move to play from a private copy of the position
         """
-        if game.is_over():
-            game.show_text()
-            return
-        _, best_move = self.expectimax(game, self.depth, True)
+        best_move = self.search(position, self.time_budget_ms if time_budget_ms is None else time_budget_ms)
         if best_move is None:
-            best_move = game.get_all_valid_moves(self.color)[0]
-        self.execute_multijump(game, best_move)
+            best_move = position.get_all_valid_moves(self.color)[0]
+        return best_move
 
-    def expectimax(self, game, depth, maximizing_player):
+    def search(self, position, time_budget_ms=None):
         """
-        Executes the expectimax algorithm
+        Returns the best move for the position, searched to the fixed depth
+        or by iterative deepening within the time budget
         """
-        if depth == 0:
-            return self.evaluate(game), None
-
-        if maximizing_player:
-            max_eval = -float('inf')
-            best_move = None
-            for move in game.get_all_valid_moves(self.color):
-                game_copy = game.clone()
-                game_copy.board.make_move(move)
-                jumped_piece = game.get_jumped_piece(move)
-                if jumped_piece:
-                    self.execute_multijump_for_clone(game_copy, jumped_piece, move)
-
-                eval, _ = self.expectimax(game_copy, depth - 1, False)
-                if eval > max_eval:
-                    max_eval = eval
+        self.nodes = 0
+        self.cutoffs = 0
+        self.score = None
+        if time_budget_ms is None:
+            self.score, best_move = self.expectimax(position, self.depth, True)
+            self.depth_reached = self.depth
+            return best_move
+
+        start = time.perf_counter()
+        best_move = None
+        self.depth_reached = 0
+        # The first iteration always completes so that there is a searched move
+        self.deadline = None
+        try:
+            for depth in range(1, self.depth + 1):
+                value, move = self.expectimax(position, depth, True)
+                if move is not None:
                     best_move = move
-            return max_eval, best_move
-        else:
+                self.score = value
+                self.depth_reached = depth
+                self.deadline = start + time_budget_ms / 1000
+                if time.perf_counter() >= self.deadline:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best_move
+
+    def expectimax(self, position, depth, maximizing_player, alpha=-float('inf'), beta=float('inf'), probe=False, ply=0):
+        """
+        Executes the expectimax algorithm, making and unmaking moves on the
+        position. With pruning the values outside (alpha, beta) are only
+        bounds. A probe searches just the first move of a max node, which
+        gives a lower bound on its value
+        """
+        self.nodes += 1
+        if self.search_stats is not None:
+            self.search_stats.count_node(ply)
+        if self.nodes & 255 == 0:
+            self.check_stop()
+        if depth == 0:
+            return self.evaluate(position), None
+        if not maximizing_player:
+            return self.chance_value(position, depth, alpha, beta, ply), None
+
+        moves = position.get_all_valid_moves(self.color)
+        if not moves:
+            return -self.evaluation_bound(), None
+        if self.pruning is not None:
+            # Captures first, so that good moves raise alpha early
+            moves.sort(key=is_capture, reverse=True)
+        if probe:
+            moves = moves[:1]
+        max_eval = -float('inf')
+        best_move = None
+        for move in moves:
+            undo = position.make_move(move)
+            eval, _ = self.expectimax(position, depth - 1, False, alpha, beta, ply=ply + 1)
+            position.unmake_move(undo)
+            if eval > max_eval:
+                max_eval = eval
+                best_move = move
+            if self.pruning is not None:
+                alpha = max(alpha, eval)
+                if eval >= beta:
+                    self.cutoffs += 1
+                    break
+        return max_eval, best_move
+
+    def opponent_outcomes(self, position, moves):
+        """
+        Returns the opponent's moves with their probabilities, most likely
+        first, keeping only the most likely moves that cover probability_mass.
+        Moves whose probability underflowed to zero add nothing to the
+        expected value and are left out
+        """
+        probabilities = self.opponent_model.probabilities(self, position, moves)
+        outcomes = sorted(((move, probability) for move, probability in zip(moves, probabilities) if probability > 0),
+                          key=lambda outcome: outcome[1], reverse=True)
+        if self.probability_mass >= 1:
+            return outcomes
+        kept = []
+        mass = 0
+        for move, probability in outcomes:
+            kept.append((move, probability))
+            mass += probability
+            if mass >= self.probability_mass:
+                break
+        return [(move, probability / mass) for move, probability in kept]
+
+    def chance_value(self, position, depth, alpha, beta, ply):
+        """
+        Returns the expected value over the opponent's moves. Star1 pruning
+        stops as soon as the searched moves and the evaluation bounds of
+        the others put the value outside (alpha, beta); Star2 first probes
+        one reply to each move to raise the lower bounds
+        """
+        moves = position.get_all_valid_moves(self.opponent_color())
+        if not moves:
+            return 0
+        outcomes = self.opponent_outcomes(position, moves)
+        if self.pruning is None:
             total_eval = 0
-            best_move = None
-            moves = game.get_all_valid_moves(self.opponent_color())
-            for move in moves:
-                game_copy = game.clone()
-                game_copy.board.make_move(move)
-                jumped_piece = game.get_jumped_piece(move)
-                if jumped_piece:
-                    self.execute_multijump_for_clone(game_copy, jumped_piece, move)
-
-                eval, _ = self.expectimax(game_copy, depth - 1, True)
-                total_eval += eval
-            if not best_move and moves:
-                best_move = moves[0]
-            return total_eval / len(moves) if moves else 0, best_move
+            for move, probability in outcomes:
+                undo = position.make_move(move)
+                eval, _ = self.expectimax(position, depth - 1, True, ply=ply + 1)
+                position.unmake_move(undo)
+                total_eval += probability * eval
+            return total_eval
+
+        bound = self.evaluation_bound()
+        lower_bounds = [-bound] * len(outcomes)
+        if self.pruning == 'star2' and depth >= 2:
+            lower_total = -bound
+            for index, (move, probability) in enumerate(outcomes):
+                # The probe only has to show that the value reaches beta
+                others = lower_total - probability * lower_bounds[index]
+                undo = position.make_move(move)
+                value, _ = self.expectimax(position, depth - 1, True, -float('inf'), (beta - others) / probability,
+                                           probe=True, ply=ply + 1)
+                position.unmake_move(undo)
+                lower_bounds[index] = max(lower_bounds[index], value)
+                lower_total = others + probability * lower_bounds[index]
+                if lower_total >= beta:
+                    self.cutoffs += 1
+                    return lower_total
+
+        searched = 0
+        lower_rest = sum(probability * lower for (_, probability), lower in zip(outcomes, lower_bounds))
+        mass_rest = 1
+        for index, (move, probability) in enumerate(outcomes):
+            lower_rest -= probability * lower_bounds[index]
+            mass_rest -= probability
+            child_alpha = (alpha - searched - mass_rest * bound) / probability
+            child_beta = (beta - searched - lower_rest) / probability
+            undo = position.make_move(move)
+            eval, _ = self.expectimax(position, depth - 1, True, child_alpha, child_beta, ply=ply + 1)
+            position.unmake_move(undo)
+            if eval <= child_alpha:
+                self.cutoffs += 1
+                return searched + probability * eval + mass_rest * bound
+            if eval >= child_beta:
+                self.cutoffs += 1
+                return searched + probability * eval + lower_rest
+            searched += probability * eval
+        return searched
+
+
+class MCTSNode:
+    """
+    Node of the Monte Carlo search tree for the position reached by its
+    move. The wins are counted for the color that played the move
+    """
+    __slots__ = ('move', 'parent', 'mover', 'key', 'children', 'untried_moves', 'visits', 'wins')
+
+    def __init__(self, move, parent, mover, key, moves):
+        self.move = move
+        self.parent = parent
+        self.mover = mover
+        self.key = key
+        self.children = []
+        self.untried_moves = moves
+        self.visits = 0
+        self.wins = 0
+
+    def select_child(self, exploration):
+        """
+        Returns the child with the highest upper confidence bound
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTSPlayer(AIPlayer):
+    """
+    Class for the Monte Carlo tree search player. It runs UCT simulations
+    with random rollouts on bitboards and plays the most visited move
+    """
+    def __init__(self, color, iterations=None, time_budget_ms=None, exploration=1.4, rollout_limit=ROLLOUT_LIMIT,
+                 workers=1, reuse_tree=True, heuristic='second', seed=None, stats=False, stats_log=None, profile=None):
+        super().__init__(color, 'bitboard', heuristic, stats, stats_log, profile)
+        if iterations is None and time_budget_ms is None:
+            iterations = MCTS_ITERATIONS
+        self.iterations = iterations
+        self.time_budget_ms = time_budget_ms
+        self.exploration = exploration
+        self.rollout_limit = rollout_limit
+        self.workers = workers
+        self.reuse_tree = reuse_tree
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.root = None
+        self.reused_visits = 0
+        self.variation = []
+
+    def __getstate__(self):
+        """
+        Leaves the process pool and the search tree out when the player is
+        sent to a worker process
+        """
+        state = super().__getstate__()
+        state['root'] = None
+        return state
+
+    def worker_copy(self):
+        """
+        Returns a serial player with the same settings, cheap to send to a
+        worker process
+        """
+        return MCTSPlayer(self.color, self.iterations, exploration=self.exploration, rollout_limit=self.rollout_limit,
+                          reuse_tree=False, heuristic=self.heuristic)
+
+    def search(self, position, time_budget_ms=None):
+        """
+        Returns the most visited move after the given number of simulations,
+        or after as many as fit in the time budget
+        """
+        self.nodes = 0
+        self.reused_visits = 0
+        self.depth_reached = 0
+        self.score = None
+        self.variation = []
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        moves = position.get_all_valid_moves(self.color)
+        if len(moves) <= 1:
+            self.root = None
+            return moves[0] if moves else None
+        if self.workers > 1:
+            return self.parallel_search(position, time_budget_ms)
+
+        root = self.reused_root(position)
+        if root is None:
+            root = self.new_root(position)
+        self.reused_visits = root.visits
+        if self.search_stats is not None:
+            self.search_stats.count_node(0)
+        try:
+            self.run_simulations(root, position, self.iterations, time_budget_ms)
+        finally:
+            self.root = root if self.reuse_tree else None
+        self.variation = self.most_visited_line(root)
+        best_child = max(root.children, key=lambda child: child.visits)
+        self.score = best_child.wins / best_child.visits
+        return best_child.move
+
+    def new_root(self, position):
+        """
+        Returns an empty tree for the position with the player to move
+        """
+        return MCTSNode(None, None, self.opponent_color(), (position.black, position.red, position.kings),
+                        position.get_all_valid_moves(self.color))
+
+    def reused_root(self, position):
+        """
+        Returns the subtree of the previous search for the position after
+        the player's move and the opponent's reply, or None when the
+        position was not reached in the previous tree
+        """
+        if self.root is None:
+            return None
+        key = (position.black, position.red, position.kings)
+        for child in self.root.children:
+            for grandchild in child.children:
+                if grandchild.key == key:
+                    grandchild.parent = None
+                    grandchild.move = None
+                    return grandchild
+        return None
+
+    def run_simulations(self, root, position, iterations, time_budget_ms):
+        """
+        Plays simulations from the root until the iteration count or the
+        time budget runs out, whichever comes first. The position is copied
+        for each simulation and left unchanged
+        """
+        deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
+        opponent = self.opponent_color()
+        while iterations is None or self.nodes < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.check_stop()
+            self.nodes += 1
+            state = position.copy()
+            node = root
+            color = self.color
+            depth = 0
+
+            # Selection: follow the upper confidence bounds through fully expanded nodes
+            while not node.untried_moves and node.children:
+                node = node.select_child(self.exploration)
+                state.make_move(node.move)
+                color = opponent if color == self.color else self.color
+                depth += 1
+
+            # Expansion: add one untried move
+            if node.untried_moves:
+                moves = node.untried_moves
+                index = self.random.randrange(len(moves))
+                moves[index], moves[-1] = moves[-1], moves[index]
+                move = moves.pop()
+                state.make_move(move)
+                mover, color = color, opponent if color == self.color else self.color
+                child = MCTSNode(move, node, mover, (state.black, state.red, state.kings),
+                                 state.get_all_valid_moves(color))
+                node.children.append(child)
+                node = child
+                depth += 1
+                if self.search_stats is not None:
+                    self.search_stats.count_node(depth)
+            self.depth_reached = max(self.depth_reached, depth)
+
+            winner = self.rollout(state, color)
+
+            # Backpropagation: a draw counts as half a win for both sides
+            while node is not None:
+                node.visits += 1
+                if winner is None:
+                    node.wins += 0.5
+                elif winner == node.mover:
+                    node.wins += 1
+                node = node.parent
+
+    def most_visited_line(self, node):
+        """
+        Returns the moves found by following the most visited child from the node
+        """
+        line = []
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            line.append(node.move)
+        return line
+
+    def principal_variation(self, position, move):
+        """
+        Returns the line of most visited moves of the last search tree
+        """
+        if self.variation and self.variation[0] == move:
+            return self.variation
+        return [move]
+
+    def rollout(self, position, color):
+        """
+        Plays random moves on the position with color to move and returns
+        the winning color, or None for a draw. A side without moves loses;
+        after rollout_limit plies the sign of the heuristic decides
+        """
+        opponent = self.opponent_color()
+        for _ in range(self.rollout_limit):
+            moves = position.get_all_valid_moves(color)
+            if not moves:
+                return opponent if color == self.color else self.color
+            position.make_move(self.random.choice(moves))
+            color = opponent if color == self.color else self.color
+        score = self.evaluate(position)
+        if score > 0:
+            return self.color
+        if score < 0:
+            return opponent
+        return None
+
+    def parallel_search(self, position, time_budget_ms):
+        """
+        Root parallelism: every worker process grows its own tree from the
+        root with a share of the iterations and a different seed, and the
+        visits of the root moves are summed to choose the move. The trees
+        stay in the workers, so they are not reused on the next move. The
+        principal variation is the line of the worker that visited the
+        chosen move most
+        """
+        self.root = None
+        template = self.worker_copy()
+        shares = [None] * self.workers
+        if self.iterations is not None:
+            shares = [self.iterations // self.workers + (index < self.iterations % self.workers)
+                      for index in range(self.workers)]
+        collect_stats = self.search_stats is not None
+        if collect_stats:
+            self.search_stats.count_node(0)
+        executor = self.worker_pool()
+        futures = [executor.submit(search_mcts_root, template, position, share, time_budget_ms,
+                                   self.random.getrandbits(32), collect_stats) for share in shares]
+        self.wait_for_workers(futures)
+
+        visits = {}
+        wins = {}
+        lines = {}
+        for future in futures:
+            statistics, nodes, depth, stats = future.result()
+            self.nodes += nodes
+            self.depth_reached = max(self.depth_reached, depth)
+            self.merge_worker_stats(stats)
+            for move, move_visits, move_wins, line in statistics:
+                visits[move] = visits.get(move, 0) + move_visits
+                wins[move] = wins.get(move, 0) + move_wins
+                if move not in lines or move_visits > lines[move][0]:
+                    lines[move] = (move_visits, line)
+        best_move = max(visits, key=visits.get)
+        self.score = wins[best_move] / visits[best_move]
+        self.variation = lines[best_move][1]
+        return best_move
@@ -0,0 +1,188 @@
+import time
+import pygame
+
+
+class Renderer:
+    """
+    Draws a checkers game in a pygame window. The rules and search modules
+    never import pygame; only this rendering layer does. The board
+    background and the piece and highlight sprites are rendered once, and
+    each frame only redraws and updates the squares that changed since the
+    previous frame
+    """
+
+    ROWS, COLS = 8, 8
+    SQUARE_SIZE = 600 // 8
+    PADDING = 5
+    DARK = (150, 90, 20)
+    LIGHT = (220, 160, 90)
+    WHITE = (255, 255, 255)
+    GREEN = (0, 255, 0)
+    TIMER_POSITION = (10, 10)
+    SCORE_POSITION = (10, 50)
+    STATS_POSITION = (10, 90)
+
+    def __init__(self, win):
+        """
+        Initializes the fonts, the game timer and the cached surfaces
+        """
+        pygame.font.init()
+        self.win = win
+        self.font = pygame.font.SysFont('Arial', 30)
+        self.start_time = time.time()
+        self.background = self.render_background()
+        radius = self.SQUARE_SIZE // 2 - self.PADDING
+        self.crown = pygame.transform.scale(pygame.image.load("crown.png"), (radius * 2, radius * 2))
+        self.sprites = {}
+        self.selected_sprite = self.render_circle(self.WHITE, self.SQUARE_SIZE // 2, 4)
+        self.move_sprite = self.render_circle(self.GREEN, self.SQUARE_SIZE // 4)
+        # What each square showed in the last frame, and the text over the board
+        self.drawn = {}
+        self.text = None
+        self.text_surfaces = []
+        self.text_rects = []
+
+    def render_background(self):
+        """
+        Returns a surface with all the squares of the board
+        """
+        background = pygame.Surface((self.COLS * self.SQUARE_SIZE, self.ROWS * self.SQUARE_SIZE))
+        background.fill(self.DARK)
+        for row in range(self.ROWS):
+            for col in range(row % 2, self.COLS, 2):
+                pygame.draw.rect(background, self.LIGHT, (col*self.SQUARE_SIZE, row*self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE))
+        return background
+
+    def render_circle(self, color, radius, width=0):
+        """
+        Returns a transparent square sprite with a circle in its center
+        """
+        sprite = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (self.SQUARE_SIZE // 2, self.SQUARE_SIZE // 2), radius, width)
+        return sprite
+
+    def piece_sprite(self, color, king):
+        """
+        Returns the square sprite of a piece, rendering it the first time
+        """
+        sprite = self.sprites.get((color, king))
+        if sprite is None:
+            radius = self.SQUARE_SIZE // 2 - self.PADDING
+            sprite = self.render_circle(color, radius)
+            if king:
+                sprite.blit(self.crown, (self.SQUARE_SIZE // 2 - radius, self.SQUARE_SIZE // 2 - radius))
+            self.sprites[(color, king)] = sprite
+        return sprite
+
+    def square_rect(self, row, col):
+        """
+        Returns the pixel rectangle of a square
+        """
+        return pygame.Rect(col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE)
+
+    def square_contents(self, board):
+        """
+        Returns what every square should show: the piece color and king
+        flag, whether the piece is selected and whether it is a move target
+        """
+        selected = board.selected_square
+        targets = set(board.valid_moves) if selected else ()
+        contents = {}
+        for row in range(self.ROWS):
+            for col in range(self.COLS):
+                piece = board.board[row][col]
+                contents[(row, col)] = (None if piece == 0 else (piece.color, piece.king),
+                                        selected == (row, col),
+                                        (row, col) in targets)
+        return contents
+
+    def draw_square(self, row, col, content):
+        """
+        Draws a square from the background and the cached sprites
+        """
+        rect = self.square_rect(row, col)
+        self.win.blit(self.background, rect, rect)
+        piece, selected, target = content
+        if piece is not None:
+            self.win.blit(self.piece_sprite(*piece), rect)
+        if selected:
+            self.win.blit(self.selected_sprite, rect)
+        if target:
+            self.win.blit(self.move_sprite, rect)
+        return rect
+
+    def squares_under(self, rects):
+        """
+        Returns the squares that overlap any of the pixel rectangles
+        """
+        squares = set()
+        for rect in rects:
+            for row in range(max(rect.top // self.SQUARE_SIZE, 0), min((rect.bottom - 1) // self.SQUARE_SIZE + 1, self.ROWS)):
+                for col in range(max(rect.left // self.SQUARE_SIZE, 0), min((rect.right - 1) // self.SQUARE_SIZE + 1, self.COLS)):
+                    squares.add((row, col))
+        return squares
+
+    def timer_and_score(self, black_score, red_score):
+        """
+        Returns the texts for the time and the result
+        """
+        current_time = int(time.time() - self.start_time)
+        minutes = current_time // 60
+        seconds = current_time % 60
+        return f"Time: {minutes}:{seconds:02}", f"Black: {black_score}  Red: {red_score}"
+
+    def update(self, game):
+        """
+        Redraws the squares that changed since the last frame and the time
+        elapsed, the score and the optional search statistics, and updates
+        only those parts of the window
+        """
+        contents = self.square_contents(game.board)
+        dirty = {square for square, content in contents.items() if self.drawn.get(square) != content}
+
+        text = self.timer_and_score(game.black_score, game.red_score)
+        if game.show_stats:
+            text += (game.search_stats_text(),)
+        if text != self.text:
+            # The squares under the old text are cleared along with the new
+            dirty |= self.squares_under(self.text_rects)
+            self.text = text
+            self.text_surfaces = [self.font.render(line, True, self.WHITE) for line in text]
+            self.text_rects = [surface.get_rect(topleft=position)
+                               for surface, position in zip(self.text_surfaces, (self.TIMER_POSITION, self.SCORE_POSITION, self.STATS_POSITION))]
+            dirty |= self.squares_under(self.text_rects)
+        if not dirty:
+            return
+        under_text = self.squares_under(self.text_rects)
+        if dirty & under_text:
+            # The antialiased text must not be blended twice over a square
+            dirty |= under_text
+
+        rects = []
+        for row, col in dirty:
+            rects.append(self.draw_square(row, col, contents[(row, col)]))
+            self.drawn[(row, col)] = contents[(row, col)]
+        if dirty & under_text:
+            for surface, rect in zip(self.text_surfaces, self.text_rects):
+                self.win.blit(surface, rect)
+        pygame.display.update(rects)
+
+    def invalidate(self):
+        """
+        Makes the next update redraw the whole board
+        """
+        self.drawn.clear()
+        self.text = None
+
+    def show_text(self, won):
+        """
+        Displays the game text at the end of the game
+        """
+        if won:
+            text = self.font.render(f"Congratulations! You won!", True, self.WHITE)
+        else:
+            text = self.font.render(f"You lost! Try again next time!", True, self.WHITE)
+        self.win.blit(text, (150, 300))
+        pygame.display.update()
+        # The message covers squares the next update must draw again
+        self.invalidate()
@@ -0,0 +1,207 @@
+import argparse
+import concurrent.futures
+import json
+import math
+import random
+import sys
+import time
+from game import Game
+from player import MinimaxPlayer, ExpectimaxPlayer, MCTSPlayer
+from zobrist import side_key
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+ALGORITHMS = {
+    'minimax': MinimaxPlayer,
+    'expectimax': ExpectimaxPlayer,
+    'mcts': MCTSPlayer,
+}
+
+def parse_flag(value):
+    """
+    Converts an on/off engine spec value to a bool
+    """
+    if value.lower() not in ('0', '1', 'false', 'true', 'no', 'yes', 'off', 'on'):
+        raise argparse.ArgumentTypeError(f"expected an on/off value, got {value!r}")
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# Short option names used in engine specs, e.g. "minimax:depth=6,heuristic=second,time=200"
+SPEC_OPTIONS = {
+    'depth': ('depth', int),
+    'heuristic': ('heuristic', str),
+    'time': ('time_budget_ms', int),
+    'tt': ('tt_size', int),
+    'backend': ('backend', str),
+    'book': ('book_path', str),
+    'tb': ('tablebase_path', str),
+    'qs': ('quiescence', parse_flag),
+    'pvs': ('pvs', parse_flag),
+    'aspiration': ('aspiration_window', int),
+    'model': ('opponent_model', str),
+    'pruning': ('pruning', str),
+    'mass': ('probability_mass', float),
+    'iterations': ('iterations', int),
+    'exploration': ('exploration', float),
+    'workers': ('workers', int),
+    'log': ('stats_log', str),
+    'profile': ('profile', str),
+}
+
+
+def parse_spec(text):
+    """
+    Parses an engine spec such as "minimax:depth=6,heuristic=second"
+    into its algorithm and constructor options
+    """
+    algorithm, _, options_text = text.partition(':')
+    if algorithm not in ALGORITHMS:
+        raise argparse.ArgumentTypeError(f"unknown algorithm {algorithm!r}, expected one of {', '.join(ALGORITHMS)}")
+    options = {}
+    for option in filter(None, options_text.split(',')):
+        name, _, value = option.partition('=')
+        if name not in SPEC_OPTIONS:
+            raise argparse.ArgumentTypeError(f"unknown option {name!r} in {text!r}")
+        keyword, convert = SPEC_OPTIONS[name]
+        options[keyword] = convert(value)
+    return {'name': text, 'algorithm': algorithm, 'options': options}
+
+
+def create_player(spec, color):
+    """
+    Creates the AI player described by an engine spec
+    """
+    return ALGORITHMS[spec['algorithm']](color, **spec['options'])
+
+
+def play_game(task):
+    """
+    Plays one headless game and returns its result record
+    """
+    index, black_spec, red_spec, opening_seed, opening_plies, max_plies = task
+    started = time.perf_counter()
+    players = {BLACK: create_player(black_spec, BLACK), RED: create_player(red_spec, RED)}
+    game = Game(None, players[BLACK], players[RED])
+    board = game.board
+    color = BLACK
+    plies = 0
+    seen = {}
+    opening = []
+    generator = random.Random(opening_seed)
+    result, reason = None, None
+
+    while result is None:
+        moves = board.get_all_valid_moves(color)
+        key = board.zobrist_key ^ side_key(color)
+        seen[key] = seen.get(key, 0) + 1
+        if not moves:
+            result, reason = ('0-1' if color == BLACK else '1-0'), 'no moves'
+        elif seen[key] >= 3:
+            result, reason = '1/2-1/2', 'repetition'
+        elif plies >= max_plies:
+            result, reason = '1/2-1/2', 'move limit'
+        else:
+            if plies < opening_plies:
+                move = generator.choice(moves)
+                opening.append(move)
+            else:
+                player = players[color]
+                move = player.think(player.search_position(game))
+            board.make_move(move)
+            plies += 1
+            color = RED if color == BLACK else BLACK
+            game.player_turn = 1 if color == BLACK else 2
+
+    for player in players.values():
+        if hasattr(player, 'close'):
+            player.close()
+    return {
+        'game': index,
+        'black': black_spec['name'],
+        'red': red_spec['name'],
+        'result': result,
+        'reason': reason,
+        'plies': plies,
+        'opening': opening,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def elo_estimate(wins, draws, losses):
+    """
+    Returns the Elo difference implied by a score and its 95% error margin
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    clamped = min(max(score, 0.5 / games), 1 - 0.5 / games)
+    elo = -400 * math.log10(1 / clamped - 1)
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    error = 1.96 * math.sqrt(variance / games) * 400 / math.log(10) / (clamped * (1 - clamped))
+    return elo, error
+
+
+def tasks(engine_a, engine_b, games, opening_plies, max_plies, seed):
+    """
+    Returns the game tasks; each opening is played twice with colours swapped
+    """
+    for index in range(games):
+        black, red = (engine_a, engine_b) if index % 2 == 0 else (engine_b, engine_a)
+        yield index, black, red, seed + index // 2, opening_plies, max_plies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI checkers games and estimate relative strength")
+    parser.add_argument('engine_a', type=parse_spec, help='e.g. minimax:depth=6,heuristic=second')
+    parser.add_argument('engine_b', type=parse_spec, help='e.g. expectimax:depth=3,heuristic=first')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None, help='processes to play games on (default: all cores)')
+    parser.add_argument('--opening-plies', type=int, default=4, help='random plies played before the engines take over')
+    parser.add_argument('--max-plies', type=int, default=200, help='plies before a game is scored as a draw')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='-', help='JSON Lines file for the results (default: stdout)')
+    args = parser.parse_args(argv)
+
+    engine_a, engine_b = args.engine_a, args.engine_b
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    wins = draws = losses = 0
+    started = time.perf_counter()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for record in executor.map(play_game, tasks(engine_a, engine_b, args.games, args.opening_plies, args.max_plies, args.seed)):
+                if record['result'] == '1/2-1/2':
+                    draws += 1
+                elif (record['result'] == '1-0') == (record['game'] % 2 == 0):
+                    wins += 1
+                else:
+                    losses += 1
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+
+        elapsed = time.perf_counter() - started
+        elo, error = elo_estimate(wins, draws, losses)
+        summary = {
+            'summary': True,
+            'engine_a': engine_a['name'],
+            'engine_b': engine_b['name'],
+            'games': wins + draws + losses,
+            'wins': wins,
+            'draws': draws,
+            'losses': losses,
+            'elo': round(elo, 1),
+            'elo_error': round(error, 1),
+            'seconds': round(elapsed, 2),
+            'games_per_minute': round(60 * (wins + draws + losses) / elapsed, 2),
+        }
+        output.write(json.dumps(summary) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{engine_a['name']} vs {engine_b['name']}: +{wins} ={draws} -{losses}, "
+          f"Elo {summary['elo']:+} ± {summary['elo_error']}, {summary['games_per_minute']} games/min", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
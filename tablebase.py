@@ -0,0 +1,373 @@
+import argparse
+import concurrent.futures
+import itertools
+import math
+import os
+import sys
+import time
+from bitboard import BitBoard
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+WIN, LOSS, DRAW = 'win', 'loss', 'draw'
+
+# One byte per position and side to move: 0 is a draw, 255 is not a legal
+# position and any other value is 1 + the number of plies to the end of
+# the game with best play. Wins end in an odd and losses in an even number
+# of plies, so the distance also gives the result
+DRAW_CODE = 0
+INVALID_CODE = 255
+MAX_DISTANCE = 253
+
+BLACK_MAN_SQUARES = tuple(range(4, 32))
+RED_MAN_SQUARES = tuple(range(0, 28))
+KING_SQUARES = tuple(range(32))
+
+
+def code_result(code):
+    """
+    Returns the result and distance in plies stored in a table byte
+    """
+    if code == DRAW_CODE:
+        return DRAW, None
+    distance = code - 1
+    return (WIN if distance % 2 else LOSS), distance
+
+
+def material_of(black, red, kings):
+    """
+    Returns the material class of the masks: the number of black men,
+    black kings, red men and red kings
+    """
+    return ((black & ~kings).bit_count(), (black & kings).bit_count(),
+            (red & ~kings).bit_count(), (red & kings).bit_count())
+
+
+def class_path(directory, material):
+    """
+    Returns the file of a material class
+    """
+    return os.path.join(directory, 'tb_{}{}{}{}.bin'.format(*material))
+
+
+def group_masks(squares, count):
+    """
+    Returns the masks of every way to place count pieces on the given
+    squares, indexed by their colex rank
+    """
+    masks = [0] * math.comb(len(squares), count)
+    for combination in itertools.combinations(range(len(squares)), count):
+        mask = 0
+        for position in combination:
+            mask |= 1 << squares[position]
+        masks[colex_rank(combination)] = mask
+    return masks
+
+
+def colex_rank(positions):
+    """
+    Returns the colex rank of ascending positions in a list of squares
+    """
+    return sum(math.comb(position, number + 1) for number, position in enumerate(positions))
+
+
+def group_rank(mask, offset):
+    """
+    Returns the colex rank of the squares of a mask, where offset is the
+    first square the group can stand on
+    """
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1 - offset)
+        mask ^= low
+    return colex_rank(positions)
+
+
+class MaterialClass:
+    """
+    Indexing of the positions with a given number of men and kings per side.
+    Each group of pieces is ranked separately, so a few indexes are
+    overlapping placements that are marked invalid in the table
+    """
+
+    def __init__(self, material):
+        """
+        Computes the group sizes of the class
+        """
+        self.material = material
+        black_men, black_kings, red_men, red_kings = material
+        self.sizes = (math.comb(len(BLACK_MAN_SQUARES), black_men), math.comb(len(KING_SQUARES), black_kings),
+                      math.comb(len(RED_MAN_SQUARES), red_men), math.comb(len(KING_SQUARES), red_kings))
+        self.size = math.prod(self.sizes)
+
+    def index(self, black, red, kings):
+        """
+        Returns the index of a position of this class
+        """
+        ranks = (group_rank(black & ~kings, BLACK_MAN_SQUARES[0]), group_rank(black & kings, 0),
+                 group_rank(red & ~kings, RED_MAN_SQUARES[0]), group_rank(red & kings, 0))
+        index = 0
+        for rank, size in zip(ranks, self.sizes):
+            index = index * size + rank
+        return index
+
+    def positions(self):
+        """
+        Yields the (black, red, kings) masks of every index in order,
+        or None for the overlapping placements
+        """
+        black_men, black_kings, red_men, red_kings = self.material
+        groups = (group_masks(BLACK_MAN_SQUARES, black_men), group_masks(KING_SQUARES, black_kings),
+                  group_masks(RED_MAN_SQUARES, red_men), group_masks(KING_SQUARES, red_kings))
+        for men_b, kings_b, men_r, kings_r in itertools.product(*groups):
+            if (men_b & kings_b or (men_b | kings_b) & (men_r | kings_r) or men_r & kings_r):
+                yield None
+            else:
+                yield men_b | kings_b, men_r | kings_r, kings_b | kings_r
+
+
+def material_classes(max_pieces):
+    """
+    Returns the material classes with both sides on the board and at most
+    max_pieces pieces, in an order where every class comes after the
+    classes its captures and promotions lead to
+    """
+    classes = []
+    for black_men, black_kings, red_men, red_kings in itertools.product(range(max_pieces + 1), repeat=4):
+        if (black_men + black_kings and red_men + red_kings
+                and black_men + black_kings + red_men + red_kings <= max_pieces):
+            classes.append((black_men, black_kings, red_men, red_kings))
+    classes.sort(key=class_level)
+    return classes
+
+
+def class_level(material):
+    """
+    Classes of the same level never depend on each other and can be
+    solved in parallel
+    """
+    return sum(material), material[0] + material[2]
+
+
+class Tablebase:
+    """
+    Endgame tables for positions with few pieces. The class files are
+    loaded lazily the first time a position of the class is probed
+    """
+
+    def __init__(self, directory, max_pieces=None):
+        """
+        Finds the solved classes in the directory; max_pieces defaults to
+        the largest class that was generated
+        """
+        self.directory = directory
+        self.tables = {}
+        self.indexes = {}
+        self.available = set()
+        for name in os.listdir(directory):
+            if name.startswith('tb_') and name.endswith('.bin') and len(name) == 11 and name[3:7].isdigit():
+                self.available.add(tuple(int(digit) for digit in name[3:7]))
+        largest = max((sum(material) for material in self.available), default=0)
+        self.max_pieces = largest if max_pieces is None else min(max_pieces, largest)
+
+    def covers(self, position):
+        """
+        Checks whether the position has few enough pieces to be probed
+        """
+        return position.piece_count(BLACK) + position.piece_count(RED) <= self.max_pieces
+
+    def table(self, material):
+        """
+        Returns the table bytes of a material class, or None if it was not generated
+        """
+        table = self.tables.get(material)
+        if table is None and material in self.available:
+            with open(class_path(self.directory, material), 'rb') as file:
+                table = file.read()
+            self.tables[material] = table
+            self.indexes[material] = MaterialClass(material)
+        return table
+
+    def lookup_code(self, black, red, kings, color):
+        """
+        Returns the table byte of the given masks with color to move, or
+        None if the class is not in the tablebase
+        """
+        own = black if color == BLACK else red
+        if not own:
+            return 1
+        material = material_of(black, red, kings)
+        table = self.table(material)
+        if table is None:
+            return None
+        index = self.indexes[material]
+        side = 0 if color == BLACK else 1
+        return table[side * index.size + index.index(black, red, kings)]
+
+    def probe(self, position, color):
+        """
+        Returns the (result, distance in plies) of a Board or BitBoard
+        position with color to move, or None when it is not in the tablebase
+        """
+        if not self.covers(position):
+            return None
+        if not isinstance(position, BitBoard):
+            position = BitBoard.from_board(position)
+        code = self.lookup_code(position.black, position.red, position.kings, color)
+        if code is None or code == INVALID_CODE:
+            return None
+        return code_result(code)
+
+    def best_move(self, position, color):
+        """
+        Returns the move that wins fastest, or draws, or loses slowest, or
+        None when the position is not in the tablebase
+        """
+        if self.probe(position, color) is None:
+            return None
+        opponent = RED if color == BLACK else BLACK
+        best_move, best_score = None, None
+        for move in position.get_all_valid_moves(color):
+            undo = position.make_move(move)
+            outcome = self.probe(position, opponent)
+            position.unmake_move(undo)
+            if outcome is None:
+                return None
+            result, distance = outcome
+            # Scores from the mover's side: a fast win beats a slow one, a
+            # draw beats any loss and a slow loss beats a fast one
+            if result == LOSS:
+                score = (2, -distance)
+            elif result == DRAW:
+                score = (1, 0)
+            else:
+                score = (0, distance)
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+        return best_move
+
+
+def solve_class(task):
+    """
+    Solves a material class by retrograde analysis and writes its table.
+    Classes whose file exists are skipped, which makes generation resumable
+    """
+    directory, material = task
+    path = class_path(directory, material)
+    if os.path.exists(path):
+        return material, False
+    started = time.perf_counter()
+    tablebase = Tablebase(directory)
+    index = MaterialClass(material)
+    size = index.size
+    values = bytearray(2 * size)
+    remaining = [0] * (2 * size)
+    longest = [-1] * (2 * size)
+    predecessors = [[] for _ in range(2 * size)]
+    buckets = [[] for _ in range(MAX_DISTANCE + 1)]
+
+    def push(node, distance):
+        if distance > MAX_DISTANCE:
+            raise RuntimeError(f"distance to the end exceeds {MAX_DISTANCE} plies in {material}")
+        buckets[distance].append(node)
+
+    # Link every position to its successors: successors in this class are
+    # resolved below, the others are read from the classes solved before
+    for number, masks in enumerate(index.positions()):
+        if masks is None:
+            values[number] = values[size + number] = INVALID_CODE
+            continue
+        position = BitBoard(*masks)
+        for side, color in enumerate((BLACK, RED)):
+            node = side * size + number
+            opponent = RED if color == BLACK else BLACK
+            moves = position.get_all_valid_moves(color)
+            if not moves:
+                push(node, 0)
+                continue
+            fastest_win = None
+            for move in moves:
+                undo = position.make_move(move)
+                black, red, kings = position.black, position.red, position.kings
+                position.unmake_move(undo)
+                if material_of(black, red, kings) == material:
+                    predecessors[(1 - side) * size + index.index(black, red, kings)].append(node)
+                    remaining[node] += 1
+                    continue
+                code = tablebase.lookup_code(black, red, kings, opponent)
+                if code is None:
+                    raise RuntimeError(f"class {material_of(black, red, kings)} must be solved before {material}")
+                result, distance = code_result(code)
+                if result == LOSS:
+                    fastest_win = distance + 1 if fastest_win is None else min(fastest_win, distance + 1)
+                elif result == WIN:
+                    longest[node] = max(longest[node], distance)
+                else:
+                    # A drawn successor means this position is never lost
+                    remaining[node] += 1
+            if fastest_win is not None:
+                # Already won, so it must not be counted down to a loss
+                remaining[node] += 1
+                push(node, fastest_win)
+            elif remaining[node] == 0:
+                push(node, longest[node] + 1)
+
+    # Resolve positions in order of distance, so the first distance a
+    # position is reached with is the shortest
+    for distance, bucket in enumerate(buckets):
+        while bucket:
+            node = bucket.pop()
+            if values[node]:
+                continue
+            values[node] = distance + 1
+            for predecessor in predecessors[node]:
+                if values[predecessor]:
+                    continue
+                if distance % 2 == 0:
+                    push(predecessor, distance + 1)
+                else:
+                    remaining[predecessor] -= 1
+                    longest[predecessor] = max(longest[predecessor], distance)
+                    if remaining[predecessor] == 0:
+                        push(predecessor, longest[predecessor] + 1)
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(values)
+    os.replace(temporary, path)
+    return material, time.perf_counter() - started
+
+
+def generate(directory, max_pieces, workers=None):
+    """
+    Generates the tables of every class with at most max_pieces pieces,
+    solving the independent classes of each level in parallel
+    """
+    os.makedirs(directory, exist_ok=True)
+    classes = material_classes(max_pieces)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for _, level in itertools.groupby(classes, key=class_level):
+            tasks = [(directory, material) for material in level]
+            for material, seconds in executor.map(solve_class, tasks):
+                if seconds is False:
+                    print(f"{material} already solved", file=sys.stderr)
+                else:
+                    print(f"{material} solved in {seconds:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate endgame tables by retrograde analysis")
+    parser.add_argument('directory', help='directory for the table files; finished classes are kept on restart')
+    parser.add_argument('--pieces', type=int, default=4, help='largest number of pieces on the board')
+    parser.add_argument('--workers', type=int, default=None, help='processes to solve classes on (default: all cores)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    generate(args.directory, args.pieces, args.workers)
+    print(f"done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from bitboard import BitBoard
+from board import Board
+
+# Functions listed in the profile of a search, most expensive first
+PROFILE_ENTRIES = 15
+# Seconds between two stack samples of the sampling profiler
+SAMPLE_INTERVAL = 0.005
+
+
+class SearchStats:
+    """
+    Statistics of one search of an AI player: the nodes entered at every
+    depth, the time spent generating moves, evaluating positions and
+    copying positions, the cutoffs, the principal variation and its score
+    """
+
+    def __init__(self, player):
+        """
+        Starts empty statistics for a search of the player
+        """
+        self.player = type(player).__name__
+        self.color = player.color
+        self.move = None
+        self.score = None
+        self.principal_variation = []
+        self.depth = 0
+        self.nodes = 0
+        self.nodes_by_depth = []
+        self.seconds = 0.0
+        self.movegen_seconds = 0.0
+        self.evaluation_seconds = 0.0
+        self.clone_seconds = 0.0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.profile = None
+
+    def count_node(self, ply, count=1):
+        """
+        Counts nodes the search entered at the given ply below the root
+        """
+        while ply >= len(self.nodes_by_depth):
+            self.nodes_by_depth.append(0)
+        self.nodes_by_depth[ply] += count
+
+    def merge(self, other):
+        """
+        Adds the nodes and times of a search a worker process ran for this
+        one. The times are summed over the workers, so together they can
+        take longer than the search
+        """
+        for ply, count in enumerate(other.nodes_by_depth):
+            self.count_node(ply, count)
+        self.movegen_seconds += other.movegen_seconds
+        self.evaluation_seconds += other.evaluation_seconds
+        self.clone_seconds += other.clone_seconds
+
+    def timed_evaluation(self, evaluate):
+        """
+        Returns the evaluation function wrapped to add its time to the stats
+        """
+        def timed(position):
+            start = time.perf_counter()
+            value = evaluate(position)
+            self.evaluation_seconds += time.perf_counter() - start
+            return value
+        return timed
+
+    def finish(self, player, position, move, seconds):
+        """
+        Takes the results of the finished search from the player
+        """
+        self.move = move
+        self.seconds = seconds
+        self.nodes = player.nodes
+        self.depth = player.depth_reached
+        self.score = player.score
+        self.cutoffs = player.cutoffs
+        self.first_move_cutoffs = player.first_move_cutoffs
+        if move is not None:
+            self.principal_variation = player.principal_variation(position, move)
+
+    def selective_depth(self):
+        """
+        Returns the deepest ply the search entered
+        """
+        return max(len(self.nodes_by_depth) - 1, 0)
+
+    def nodes_per_second(self):
+        """
+        Returns the search speed
+        """
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self):
+        """
+        Returns the statistics as a JSON serializable dict
+        """
+        return {
+            'player': self.player,
+            'color': self.color,
+            'move': self.move,
+            'score': self.score,
+            'pv': self.principal_variation,
+            'depth': self.depth,
+            'selective_depth': self.selective_depth(),
+            'nodes': self.nodes,
+            'nodes_by_depth': self.nodes_by_depth,
+            'nodes_per_second': round(self.nodes_per_second(), 1),
+            'seconds': round(self.seconds, 6),
+            'movegen_seconds': round(self.movegen_seconds, 6),
+            'evaluation_seconds': round(self.evaluation_seconds, 6),
+            'clone_seconds': round(self.clone_seconds, 6),
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'profile': self.profile,
+        }
+
+    def write(self, path):
+        """
+        Appends the statistics as one JSON line to the log file
+        """
+        with open(path, 'a') as log:
+            log.write(json.dumps(self.to_dict()) + '\n')
+
+
+def plain_board(state):
+    """
+    Rebuilds a Board from its attributes after pickling
+    """
+    board = object.__new__(Board)
+    board.__dict__.update(state)
+    return board
+
+
+class InstrumentedPosition:
+    """
+    Mixin for the position classes that times move generation while the
+    search runs on them
+    """
+
+    def get_all_valid_moves(self, color):
+        start = time.perf_counter()
+        moves = super().get_all_valid_moves(color)
+        self.stats.movegen_seconds += time.perf_counter() - start
+        return moves
+
+
+class InstrumentedBitBoard(InstrumentedPosition, BitBoard):
+    """
+    BitBoard that records into search statistics. Copies are timed as
+    clones, and it is sent to worker processes as a plain BitBoard
+    """
+
+    def copy(self):
+        start = time.perf_counter()
+        position = instrument(super().copy(), self.stats)
+        self.stats.clone_seconds += time.perf_counter() - start
+        return position
+
+    def __reduce__(self):
+        return BitBoard, (self.black, self.red, self.kings)
+
+
+class InstrumentedBoard(InstrumentedPosition, Board):
+    """
+    Board that records into search statistics. It is sent to worker
+    processes as a plain Board
+    """
+
+    def __reduce__(self):
+        return plain_board, (Board.clone(self).__dict__,)
+
+
+def instrument(position, stats):
+    """
+    Returns a copy of a Board or BitBoard position that records into stats
+    while it is searched. It is still an instance of the position's class,
+    so the search, the tablebase and the ordering treat it as usual
+    """
+    if isinstance(position, BitBoard):
+        copy = object.__new__(InstrumentedBitBoard)
+        for name in BitBoard.__slots__:
+            setattr(copy, name, getattr(position, name))
+    else:
+        copy = position.clone()
+        copy.__class__ = InstrumentedBoard
+    copy.stats = stats
+    return copy
+
+
+def function_label(filename, line, name):
+    """
+    Returns a short label for a profiled function
+    """
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class SamplingProfiler:
+    """
+    Records which functions a thread is in by looking at its stack at a
+    fixed interval from a background thread. It slows the search down much
+    less than cProfile, but only sees the functions that run for a while
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        """
+        Initializes the sample counts
+        """
+        self.interval = interval
+        self.samples = 0
+        self.counts = {}
+        self.self_counts = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id):
+        """
+        Starts sampling the stack of the thread with the given id
+        """
+        self.thread = threading.Thread(target=self.run, args=(thread_id,), name="search-sampler", daemon=True)
+        self.thread.start()
+
+    def run(self, thread_id):
+        """
+        Samples the thread until the profiler is stopped
+        """
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            code = frame.f_code
+            leaf = function_label(code.co_filename, code.co_firstlineno, code.co_name)
+            self.self_counts[leaf] = self.self_counts.get(leaf, 0) + 1
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                label = function_label(code.co_filename, code.co_firstlineno, code.co_name)
+                if label not in seen:
+                    seen.add(label)
+                    self.counts[label] = self.counts.get(label, 0) + 1
+                frame = frame.f_back
+
+    def stop(self):
+        """
+        Stops sampling and returns the functions seen most often
+        """
+        self.stopped.set()
+        self.thread.join()
+        entries = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:PROFILE_ENTRIES]
+        return [{'function': label, 'samples': count, 'self_samples': self.self_counts.get(label, 0),
+                 'fraction': round(count / self.samples, 4)} for label, count in entries]
+
+
+def profile_call(mode, function, *args):
+    """
+    Calls the function under the given profiler, 'cprofile' or 'sampling',
+    and returns its result with the functions that took the most time, or
+    with None when mode is None
+    """
+    if mode is None:
+        return function(*args), None
+    if mode == 'sampling':
+        profiler = SamplingProfiler()
+        profiler.start(threading.get_ident())
+        try:
+            result = function(*args)
+        finally:
+            entries = profiler.stop()
+        return result, entries
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args)
+    statistics = pstats.Stats(profiler)
+    statistics.sort_stats(pstats.SortKey.CUMULATIVE)
+    entries = []
+    for key in statistics.fcn_list[:PROFILE_ENTRIES]:
+        _, calls, self_seconds, cumulative_seconds, _ = statistics.stats[key]
+        entries.append({'function': function_label(*key), 'calls': calls, 'self_seconds': round(self_seconds, 6),
+                        'cumulative_seconds': round(cumulative_seconds, 6)})
+    return result, entries
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The game modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every board move in the tests checks the incremental key and totals
+os.environ.setdefault('CHECKERS_CHECK_INCREMENTAL', '1')
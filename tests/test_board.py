@@ -0,0 +1,102 @@
+from board import Board
+from game import Game
+from notation import game_from_fen
+
+BLACK = Board.BLACK
+
+# Black's man on (5, 2) must capture twice: (5, 2) -> (3, 4) -> (1, 6)
+DOUBLE_JUMP = 'B:W14,15,22:B6,7,10,11,26'
+# Black's man on (2, 7) is crowned by jumping to (0, 5)
+CROWNING_JUMP = 'B:W24,K25:B21'
+
+
+def jump(board, row, col):
+    """
+    Makes the selected piece's next hop the way the main loop does
+    """
+    board.select_and_move(row, col)
+    board.delete_piece(*board.jumped_square)
+
+
+def test_cloned_game_continues_multijump():
+    game = game_from_fen(Game(None, None, None), DOUBLE_JUMP)
+    game.board.select(5, 2, BLACK)
+    jump(game.board, 3, 4)
+
+    clone = game.clone()
+    clone.board.select(3, 4, BLACK)
+    assert clone.board.valid_moves == [(1, 6)]
+    jump(clone.board, 1, 6)
+    assert clone.board.get_valid_moves_after_jump(1, 6) == []
+    assert clone.board.get_piece(1, 6) != 0
+
+    # The original is still halfway through its move
+    assert game.board.get_piece(3, 4) != 0 and game.board.get_piece(1, 6) == 0
+    assert game.board.get_valid_moves_after_jump(3, 4) == [(1, 6)]
+
+
+def test_crowning_jump_ends_move_on_clone():
+    game = game_from_fen(Game(None, None, None), CROWNING_JUMP)
+    game.board.select(2, 7, BLACK)
+    jump(game.board, 0, 5)
+    assert game.board.get_piece(0, 5).king
+    assert game.clone().board.get_valid_moves_after_jump(0, 5) == []
+
+
+def test_clone_of_new_board_has_no_jump_in_progress():
+    assert Board().clone().get_valid_moves_after_jump(5, 0) == []
+
+
+def board_state(board):
+    return [row[:] for row in board.board], board.zobrist_key, {color: totals[:] for color, totals in board.totals.items()}
+
+
+def test_snapshots_stay_unchanged():
+    from test_movegen import random_games
+    for board, _, color in random_games(20, max_plies=60, seed=5):
+        moves = board.get_all_valid_moves(color)
+        if not moves:
+            continue
+        snapshot = board.clone()
+        before = board_state(board)
+        snapshot.make_move(moves[-1])
+        if snapshot.get_piece(*moves[0][0]) != 0:
+            snapshot.delete_piece(*moves[0][0])
+        assert board_state(board) == before
+        # The original changing must not show through the snapshot either
+        after = board_state(snapshot)
+        board_undo = board.make_move(moves[0])
+        assert board_state(snapshot) == after
+        board.unmake_move(board_undo)
+        assert board_state(board) == before
+        assert board.get_all_valid_moves(color) == moves
+
+
+def test_game_clone_is_independent():
+    game = game_from_fen(Game(None, None, None), DOUBLE_JUMP)
+    before = board_state(game.board)
+    clone = game.clone()
+    clone.board.make_move(clone.get_all_valid_moves(BLACK)[0])
+    clone.red_score += 2
+    assert board_state(game.board) == before
+    assert game.red_score != clone.red_score
+
+
+def test_ui_jumps_follow_the_legal_capture_paths():
+    from test_movegen import random_games
+    checked = 0
+    for board, _, color in random_games(30, seed=6):
+        moves = board.get_all_valid_moves(color)
+        if not moves or abs(moves[0][1][0] - moves[0][0][0]) != 2:
+            continue
+        for move in moves:
+            snapshot = board.clone()
+            snapshot.select(*move[0], color)
+            for index, hop in enumerate(move[1:], 1):
+                continuations = {path[index] for path in moves if path[:index] == move[:index] and len(path) > index}
+                assert set(snapshot.valid_moves) == continuations
+                jump(snapshot, *hop)
+                snapshot.valid_moves = snapshot.get_valid_moves_after_jump(*hop)
+            assert snapshot.valid_moves == []
+            checked += 1
+    assert checked > 100
@@ -0,0 +1,55 @@
+import random
+from bitboard import BitBoard
+from board import Board
+
+BLACK, RED = Board.BLACK, Board.RED
+
+
+def random_games(count, max_plies=200, seed=0):
+    """
+    Yields the Board, BitBoard and color to move of every position of
+    random games, played on both backends side by side
+    """
+    generator = random.Random(seed)
+    for _ in range(count):
+        board = Board()
+        position = BitBoard.from_board(board)
+        color = BLACK
+        for _ in range(max_plies):
+            yield board, position, color
+            moves = board.get_all_valid_moves(color)
+            if not moves:
+                break
+            move = generator.choice(moves)
+            board.make_move(move)
+            position.make_move(move)
+            color = RED if color == BLACK else BLACK
+
+
+def test_incremental_checks_are_enabled():
+    assert Board.CHECK_INCREMENTAL
+
+
+def test_backends_agree_on_moves_and_keys():
+    for board, position, color in random_games(40):
+        assert position.get_all_valid_moves(color) == board.get_all_valid_moves(color)
+        assert position.zobrist_key == board.zobrist_key == position.compute_zobrist_key()
+        expected = BitBoard.from_board(board)
+        assert (position.black, position.red, position.kings) == (expected.black, expected.red, expected.kings)
+        for kind in (board.piece_count, board.king_count, board.center_count):
+            assert kind(color) == getattr(position, kind.__name__)(color)
+
+
+def test_unmake_restores_both_backends():
+    for board, position, color in random_games(10, seed=1):
+        rows = [row[:] for row in board.board]
+        key, masks = board.zobrist_key, (position.black, position.red, position.kings, position.zobrist_key)
+        for move in board.get_all_valid_moves(color):
+            board_undo = board.make_move(move)
+            position_undo = position.make_move(move)
+            assert position.zobrist_key == board.zobrist_key
+            assert position.capture_count(move) == board.capture_count(move)
+            board.unmake_move(board_undo)
+            position.unmake_move(position_undo)
+        assert board.board == rows and board.zobrist_key == key
+        assert (position.black, position.red, position.kings, position.zobrist_key) == masks
@@ -0,0 +1,41 @@
+from game import Game
+from notation import (board_from_fen, board_to_fen, decode, decode_board, decode_game, encode, encode_board,
+                      encode_game, game_from_fen, game_to_fen, parse_fen, to_fen)
+from test_movegen import random_games
+
+
+def masks(position):
+    return position.black, position.red, position.kings, position.zobrist_key
+
+
+def test_fen_round_trips():
+    for board, position, color in random_games(40, seed=2):
+        fen = to_fen(position, color)
+        parsed, parsed_color = parse_fen(fen)
+        assert masks(parsed) == masks(position) and parsed_color == color
+        assert board_to_fen(board, color) == fen
+        parsed_board, parsed_color = board_from_fen(fen)
+        assert parsed_board.board == board.board and parsed_color == color
+        assert parsed_board.zobrist_key == board.zobrist_key and parsed_board.totals == board.totals
+
+
+def test_binary_round_trips():
+    for board, position, color in random_games(40, seed=3):
+        data = encode(position, color)
+        decoded, decoded_color = decode(data)
+        assert masks(decoded) == masks(position) and decoded_color == color
+        assert encode_board(board, color) == data
+        decoded_board, decoded_color = decode_board(data)
+        assert decoded_board.board == board.board and decoded_color == color
+
+
+def test_game_round_trips():
+    for board, _, color in random_games(5, seed=4):
+        game = Game(None, None, None)
+        game.board = board.clone()
+        game.player_turn = 1 if color == board.BLACK else 2
+        fen = game_to_fen(game)
+        copy = game_from_fen(Game(None, None, None), fen)
+        assert copy.board.board == board.board and game_to_fen(copy) == fen
+        copy = decode_game(Game(None, None, None), encode_game(game))
+        assert copy.board.board == board.board and encode_game(copy) == encode_game(game)
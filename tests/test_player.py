@@ -0,0 +1,35 @@
+import pytest
+from bitboard import BitBoard
+from opponent import SoftmaxModel
+from player import MinimaxPlayer, ExpectimaxPlayer
+from test_movegen import random_games
+
+RED = (255, 0, 0)
+
+
+def test_star_pruning_survives_underflowing_probabilities():
+    # At this temperature most softmax weights underflow to exactly zero
+    searched = 0
+    for index, (board, _, color) in enumerate(random_games(15, max_plies=80, seed=7)):
+        position = BitBoard.from_board(board)
+        if index % 8 or len(position.get_all_valid_moves(color)) < 2:
+            continue
+        scores = []
+        for pruning in (None, 'star1', 'star2'):
+            player = ExpectimaxPlayer(color, 3, opponent_model=SoftmaxModel(0.002), pruning=pruning)
+            player.search(position.copy())
+            scores.append(player.score)
+        assert scores[1] == pytest.approx(scores[0]) and scores[2] == pytest.approx(scores[0])
+        searched += 1
+    assert searched > 50
+
+
+def test_parallel_search_keeps_choosing_the_serial_moves():
+    serial = MinimaxPlayer(RED, 4, tt_size=0)
+    parallel = MinimaxPlayer(RED, 4, tt_size=0, workers=2)
+    try:
+        for _, position, color in random_games(2, max_plies=80, seed=3):
+            if color == RED and len(position.get_all_valid_moves(RED)) > 1:
+                assert parallel.search(position.copy()) == serial.search(position.copy())
+    finally:
+        parallel.close()
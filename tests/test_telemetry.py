@@ -0,0 +1,57 @@
+import pickle
+from notation import parse_fen
+from player import MinimaxPlayer, ExpectimaxPlayer, MCTSPlayer
+from telemetry import SearchStats, instrument
+
+MIDGAME = 'B:W18,20,21,23-26,28,30-32:B1-3,5-7,9,11,13,14,16'
+
+
+def test_instrumented_positions_pickle_as_plain_positions():
+    position, color = parse_fen(MIDGAME)
+    player = MinimaxPlayer(color, 2)
+    for plain in (position, position.to_board()):
+        copy = pickle.loads(pickle.dumps(instrument(plain, SearchStats(player))))
+        assert type(copy) is type(plain)
+        assert copy.zobrist_key == plain.zobrist_key
+        assert copy.get_all_valid_moves(color) == plain.get_all_valid_moves(color)
+
+
+def test_parallel_players_collect_stats():
+    position, color = parse_fen(MIDGAME)
+    minimax = MinimaxPlayer(color, 5, workers=2, stats=True)
+    mcts = MCTSPlayer(color, 100, workers=2, seed=1, stats=True)
+    for player in (minimax, mcts):
+        try:
+            move = player.think(position.copy())
+        finally:
+            player.close()
+        stats = player.last_stats
+        assert move in position.get_all_valid_moves(color)
+        assert stats.move == move
+        assert stats.movegen_seconds > 0 and stats.evaluation_seconds > 0
+        assert stats.depth > 1 and stats.selective_depth() >= stats.depth
+
+    # The workers send back what they counted, so the stats cover the whole search
+    stats = minimax.last_stats
+    assert sum(stats.nodes_by_depth) == stats.nodes
+    assert stats.selective_depth() == stats.depth == 5
+    stats = mcts.last_stats
+    assert sum(stats.nodes_by_depth) == 1 + stats.nodes == 1 + 100
+    assert len(stats.principal_variation) > 1
+
+
+def test_nodes_are_counted_where_the_search_enters_them():
+    position, color = parse_fen(MIDGAME)
+    for player in (MinimaxPlayer(color, 5, stats=True), MinimaxPlayer(color, 3, quiescence=True, stats=True),
+                   ExpectimaxPlayer(color, 3, opponent_model='softmax', stats=True)):
+        player.think(position.copy())
+        stats = player.last_stats
+        assert sum(stats.nodes_by_depth) == stats.nodes
+        assert stats.nodes_by_depth[0] == 1
+
+    # Rollout plies are not search nodes: only the tree the player grew counts
+    player = MCTSPlayer(color, 200, seed=1, stats=True)
+    player.think(position.copy())
+    stats = player.last_stats
+    assert stats.selective_depth() == stats.depth == player.depth_reached
+    assert sum(stats.nodes_by_depth) == 1 + 200
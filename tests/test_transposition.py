@@ -0,0 +1,35 @@
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+KEY = 0x1234
+
+
+def test_shallower_result_keeps_the_deeper_entry():
+    table = TranspositionTable(16)
+    table.store(KEY, 6, EXACT, 10, 'deep')
+    table.store(KEY, 2, EXACT, -3, 'shallow')
+    table.store(KEY, 3, LOWER, 5, 'bound')
+    entry = table.probe(KEY)
+    assert (entry.depth, entry.value, entry.move) == (6, 10, 'deep')
+
+
+def test_exact_result_replaces_a_deeper_bound():
+    table = TranspositionTable(16)
+    table.store(KEY, 6, UPPER, 10, 'bound')
+    table.store(KEY, 2, EXACT, -3, 'exact')
+    entry = table.probe(KEY)
+    assert (entry.depth, entry.flag, entry.move) == (2, EXACT, 'exact')
+
+
+def test_result_at_least_as_deep_replaces_the_entry():
+    table = TranspositionTable(16)
+    table.store(KEY, 4, EXACT, 10, 'old')
+    table.store(KEY, 4, LOWER, 7, 'new')
+    assert table.probe(KEY).move == 'new'
+
+
+def test_entry_from_an_earlier_move_is_replaced():
+    table = TranspositionTable(16)
+    table.store(KEY, 6, EXACT, 10, 'old')
+    table.new_search()
+    table.store(KEY, 1, UPPER, 2, 'new')
+    assert table.probe(KEY).move == 'new'
@@ -0,0 +1,49 @@
+import pytest
+from game import Game
+from notation import game_from_fen
+from player import HumanPlayer, MinimaxPlayer, ExpectimaxPlayer, SearchCancelled
+from worker import SearchWorker
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+# Red has a single legal move, the capture (2, 1) -> (4, 3)
+FORCED_CAPTURE = 'W:W18,21,22,24,27-32:B1-6,8,9,11,19,20'
+
+
+@pytest.mark.parametrize('player', [
+    MinimaxPlayer(RED, time_budget_ms=60000),
+    MinimaxPlayer(RED, depth=30, aspiration_window=2),
+    ExpectimaxPlayer(RED, depth=30, time_budget_ms=60000),
+])
+def test_cancelled_search_reports_no_move(player):
+    game = Game(None, HumanPlayer(BLACK), player)
+    game.board.make_move(game.get_all_valid_moves(BLACK)[0])
+    game.player_turn = 2
+    worker = SearchWorker(player, game)
+    worker.cancel(timeout=10)
+    assert worker.done()
+    assert worker.cancelled
+    assert worker.result() is None
+
+
+def test_cancelled_timed_search_raises():
+    player = MinimaxPlayer(RED, time_budget_ms=60000)
+    game = Game(None, HumanPlayer(BLACK), player)
+    position = player.search_position(game)
+    player.stop()
+    with pytest.raises(SearchCancelled):
+        player.choose_move(position)
+
+
+def test_forced_move_is_played_without_searching():
+    class NoSearchPlayer(MinimaxPlayer):
+        def think(self, position, time_budget_ms=None):
+            raise AssertionError("a single legal move was searched")
+
+    player = NoSearchPlayer(RED, depth=4)
+    game = game_from_fen(Game(None, HumanPlayer(BLACK), player), FORCED_CAPTURE)
+    moves = game.get_all_valid_moves(RED)
+    assert len(moves) == 1
+    game.poll_ai_turn()
+    assert game.ai_search.done()
+    assert game.ai_search.result() == moves[0]
@@ -0,0 +1,113 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionEntry:
+    """
+    A single stored search result
+    """
+    __slots__ = ('key', 'depth', 'flag', 'value', 'move', 'generation')
+
+    def __init__(self, key, depth, flag, value, move, generation):
+        self.key = key
+        self.depth = depth
+        self.flag = flag
+        self.value = value
+        self.move = move
+        self.generation = generation
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results indexed by Zobrist key.
+    A slot is replaced when it is empty, was written during an earlier move
+    or was searched less deeply than the new result. A deeper entry of the
+    same position is only replaced by an exact result when it holds a bound
+    """
+
+    # Rough cost of one filled slot in CPython (entry object plus its list slot)
+    ENTRY_BYTES = 120
+
+    def __init__(self, size=1 << 16):
+        """
+        Initializes the table with the given number of slots,
+        rounded down to a power of two
+        """
+        self.size = 1 << (max(size, 1).bit_length() - 1)
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @classmethod
+    def from_megabytes(cls, megabytes):
+        """
+        Creates a table that fits roughly in the given memory budget
+        """
+        return cls(int(megabytes * 1024 * 1024) // cls.ENTRY_BYTES)
+
+    def new_search(self):
+        """
+        Marks the start of a new root search so older entries can be replaced
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Returns the entry stored for the key, or None
+        """
+        entry = self.entries[key & self.mask]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.key != key:
+            self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, flag, value, move):
+        """
+        Stores a search result if the replacement policy allows it
+        """
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is not None:
+            if entry.generation == self.generation and entry.depth > depth:
+                # An exact result still replaces a deeper bound on the same position
+                if entry.key != key or flag != EXACT or entry.flag == EXACT:
+                    return
+            self.replacements += 1
+        self.stores += 1
+        self.entries[index] = TranspositionEntry(key, depth, flag, value, move, self.generation)
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters
+        """
+        self.entries = [None] * self.size
+        self.hits = self.misses = self.collisions = self.stores = self.replacements = 0
+
+    def stats(self):
+        """
+        Returns the counters used to size the table
+        """
+        filled = sum(1 for entry in self.entries if entry is not None)
+        probes = self.hits + self.misses
+        return {
+            'size': self.size,
+            'filled': filled,
+            'memory_bytes': filled * self.ENTRY_BYTES,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'stores': self.stores,
+            'replacements': self.replacements,
+        }
@@ -0,0 +1,82 @@
+import numpy as np
+from bitboard import BLACK, CENTER, COORDS
+from player import KING_VALUE, PIECE_VALUE, CENTER_VALUE
+
+
+class WeightTables:
+    """
+    Per-square evaluation weights for men and kings of both colors, built
+    from four terms: material per piece, extra value per king, value per
+    piece in the center and value per row a man has advanced
+    """
+
+    def __init__(self, material=0, king=0, center=0, advancement=0):
+        """
+        Builds the tables from the given term weights
+        """
+        self.terms = {'material': material, 'king': king, 'center': center, 'advancement': advancement}
+        self.men = {}
+        self.kings = {}
+        for color, black in ((BLACK, True), ((255, 0, 0), False)):
+            men = []
+            kings = []
+            for square, (row, _) in enumerate(COORDS):
+                base = material + (center if CENTER >> square & 1 else 0)
+                advanced = 7 - row if black else row
+                men.append(base + advancement * advanced)
+                kings.append(base + king)
+            self.men[color] = men
+            self.kings[color] = kings
+
+
+# Weight tables that reproduce the scalar heuristics of AIPlayer exactly
+HEURISTIC_WEIGHTS = {
+    'first': WeightTables(material=1),
+    'second': WeightTables(material=PIECE_VALUE, king=KING_VALUE),
+    'third': WeightTables(center=CENTER_VALUE),
+}
+
+
+class BatchEvaluator:
+    """
+    Scores many bitboard positions in one vectorized NumPy call
+    """
+
+    def __init__(self, color, weights):
+        """
+        Prepares the weight vectors for the given point of view
+        """
+        opponent = (255, 0, 0) if color == BLACK else BLACK
+        self.black_view = color == BLACK
+        self.weights = weights
+        dtype = np.int64 if all(isinstance(value, int) for value in weights.terms.values()) else np.float64
+        # Rows: own men, own kings, opponent men, opponent kings
+        self.table = np.array([weights.men[color], weights.kings[color],
+                               [-value for value in weights.men[opponent]],
+                               [-value for value in weights.kings[opponent]]], dtype=dtype)
+
+    def encode(self, masks):
+        """
+        Encodes (black, red, kings) mask triples as a (n, 4, 32) array of
+        own men, own kings, opponent men and opponent kings
+        """
+        packed = np.array(masks, dtype='<u4').reshape(-1, 3)
+        bits = np.unpackbits(packed.view(np.uint8), bitorder='little').reshape(-1, 3, 32)
+        black, red, kings = bits[:, 0], bits[:, 1], bits[:, 2]
+        own, other = (black, red) if self.black_view else (red, black)
+        return np.stack((own & ~kings, own & kings, other & ~kings, other & kings), axis=1)
+
+    def evaluate_masks(self, masks):
+        """
+        Returns the scores of a batch of (black, red, kings) mask triples
+        """
+        if not masks:
+            return []
+        features = self.encode(masks)
+        return np.einsum('nks,ks->n', features, self.table).tolist()
+
+    def evaluate_many(self, positions):
+        """
+        Returns the scores of a batch of bitboard positions
+        """
+        return self.evaluate_masks([(position.black, position.red, position.kings) for position in positions])
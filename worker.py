@@ -0,0 +1,69 @@
+import threading
+import time
+from player import SearchCancelled
+
+
+class SearchWorker:
+    """
+    Searches for an AI player's move in a background thread on a snapshot
+    of the game position, so that the pygame event loop keeps running
+    """
+
+    def __init__(self, player, game, moves=None):
+        """
+        Takes the snapshot and starts the search. Given the game's list of
+        legal moves, a single legal move is played without searching
+        """
+        self.player = player
+        self.started = time.perf_counter()
+        self.move = None
+        self.error = None
+        self.cancelled = False
+        player.stop_requested = False
+        if moves is not None and len(moves) == 1:
+            self.position = None
+            self.move = moves[0]
+            self.thread = None
+            return
+        self.position = player.search_position(game)
+        self.thread = threading.Thread(target=self.run, name="ai-search", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Runs the search in the worker thread
+        """
+        try:
+            self.move = self.player.think(self.position)
+        except SearchCancelled:
+            self.cancelled = True
+        except Exception as error:
+            self.error = error
+
+    def done(self):
+        """
+        Checks whether the search has finished
+        """
+        return self.thread is None or not self.thread.is_alive()
+
+    def elapsed(self):
+        """
+        Returns the seconds since the search started
+        """
+        return time.perf_counter() - self.started
+
+    def result(self):
+        """
+        Returns the chosen move, or None if the search was cancelled
+        """
+        if self.error is not None:
+            raise self.error
+        return self.move
+
+    def cancel(self, timeout=1.0):
+        """
+        Stops the search and waits for the worker thread to finish
+        """
+        self.player.stop()
+        if self.thread is not None:
+            self.thread.join(timeout)
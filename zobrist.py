@@ -0,0 +1,25 @@
+import random
+
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+# Fixed seed so that keys are the same in every run and can be stored on disk
+_random = random.Random(20240601)
+
+# One key per square for black men, black kings, red men and red kings
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(32)] for _ in range(4)]
+SIDE_KEYS = {BLACK: 0, RED: _random.getrandbits(64)}
+
+
+def piece_key(color, king, row, col):
+    """
+    Returns the key of a piece standing on the given coordinates
+    """
+    return PIECE_KEYS[(2 if color == RED else 0) + (1 if king else 0)][row * 4 + col // 2]
+
+
+def side_key(color):
+    """
+    Returns the key mixed in when the given color is to move
+    """
+    return SIDE_KEYS[RED if color == RED else BLACK]